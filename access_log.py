@@ -0,0 +1,201 @@
+# access_log.py
+"""Append-only access log.
+
+Entries are JSON lines in segment files under data/logs/, named after the
+time their first entry was written (access-<epoch ms>.jsonl) so that a plain
+sort orders them. The monitor only enqueues entries; a background writer
+thread batches them, flushes/fsyncs on an interval and rotates segments by
+size or age.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from events import get_logger
+
+DATA_DIR = "data"
+LOG_DIR = os.path.join(DATA_DIR, "logs")
+LEGACY_LOG_PATH = os.path.join(DATA_DIR, "logs.json")
+SEGMENT_PREFIX = "access-"
+SEGMENT_SUFFIX = ".jsonl"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+log = get_logger("access_log")
+
+
+def segment_name(ts):
+    return f"{SEGMENT_PREFIX}{int(ts * 1000):015d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(log_dir=LOG_DIR):
+    """Segment paths, oldest first."""
+    if not os.path.isdir(log_dir):
+        return []
+    names = sorted(n for n in os.listdir(log_dir)
+                   if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(log_dir, n) for n in names]
+
+
+def make_entry(user, ts=None, **fields):
+    ts = time.time() if ts is None else ts
+    entry = {"ts": round(ts, 3), "time": time.strftime(TIME_FORMAT, time.localtime(ts)), "user": user}
+    entry.update(fields)
+    return entry
+
+
+def encode_entry(entry):
+    return json.dumps(entry, separators=(",", ":")) + "\n"
+
+
+def read_entries(log_dir=LOG_DIR):
+    """Yield every entry, oldest first. Torn trailing lines are skipped."""
+    for path in list_segments(log_dir):
+        with open(path, "r") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+
+
+def clear_logs(log_dir=LOG_DIR):
+    for path in list_segments(log_dir):
+        os.remove(path)
+        if os.path.exists(path + ".idx"):  # sparse index written by log_query
+            os.remove(path + ".idx")
+
+
+class AccessLogWriter:
+    """Background, batched writer for the segmented access log."""
+
+    def __init__(self, log_dir=LOG_DIR, flush_interval=1.0, batch_size=256, fsync=True,
+                 max_segment_bytes=8 * 1024 * 1024, max_segment_seconds=24 * 3600):
+        self.log_dir = log_dir
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self._queue = queue.Queue()
+        self._thread = None
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self.written = 0
+
+    def start(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="access-log", daemon=True)
+        self._thread.start()
+        return self
+
+    def log(self, user, **fields):
+        """Queue one entry; never blocks on disk I/O."""
+        entry = make_entry(user, **fields)
+        self._queue.put(entry)
+        return entry
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- writer thread --------------------------------------------------
+    def _segment_for(self, ts):
+        """Open (or rotate to) the segment the next batch should go to."""
+        if self._file is not None:
+            expired = ts - self._opened_at >= self.max_segment_seconds
+            too_big = self._file.tell() >= self.max_segment_bytes
+            deleted = not os.path.exists(self._path)  # e.g. cleared from the admin panel
+            if not (expired or too_big or deleted):
+                return self._file
+            self._file.close()
+            self._file = None
+        segments = list_segments(self.log_dir)
+        if segments and self._path is None:
+            # resume the newest segment after a restart if it still has room
+            last = segments[-1]
+            opened = int(os.path.basename(last)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) / 1000.0
+            if os.path.getsize(last) < self.max_segment_bytes and ts - opened < self.max_segment_seconds:
+                self._path, self._opened_at = last, opened
+                self._file = open(last, "a")
+                return self._file
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._path, self._opened_at = os.path.join(self.log_dir, segment_name(ts)), ts
+        self._file = open(self._path, "a")
+        return self._file
+
+    def _write(self, batch):
+        if not batch:
+            return
+        f = self._segment_for(batch[0]["ts"])
+        f.write("".join(encode_entry(e) for e in batch))
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        self.written += len(batch)
+
+    def _run(self):
+        batch, waiters = [], []
+        deadline = time.time() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                item = False
+            if item is None:
+                stopping = True
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not False:
+                batch.append(item)
+            if stopping or waiters or len(batch) >= self.batch_size or time.time() >= deadline:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    log.error("Failed to write access log", error=e, dropped=len(batch))
+                batch = []
+                for w in waiters:
+                    w.set()
+                waiters = []
+                deadline = time.time() + self.flush_interval
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def migrate_json_log(json_path=LEGACY_LOG_PATH, log_dir=LOG_DIR):
+    """Convert a legacy logs.json array into a segment; renames the source to *.migrated."""
+    if not os.path.exists(json_path):
+        return 0
+    with open(json_path, "r") as f:
+        logs = json.load(f)
+    os.makedirs(log_dir, exist_ok=True)
+    if logs:
+        entries = []
+        for e in logs:
+            try:
+                ts = time.mktime(time.strptime(e["time"], TIME_FORMAT))
+            except (KeyError, ValueError):
+                ts = 0.0
+            entries.append(make_entry(e.get("user"), ts=ts))
+        entries.sort(key=lambda e: e["ts"])
+        path = os.path.join(log_dir, segment_name(entries[0]["ts"]))
+        with open(path, "a") as f:
+            f.write("".join(encode_entry(e) for e in entries))
+    os.replace(json_path, json_path + ".migrated")
+    log.info("Migrated access log", entries=len(logs), source=json_path, log_dir=log_dir)
+    return len(logs)
+
+
+if __name__ == "__main__":
+    migrate_json_log(*sys.argv[1:3])
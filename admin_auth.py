@@ -10,13 +10,15 @@ from math import gcd
 import hashlib
 import threading
 import tkinter as tk
-import traceback
+from events import get_logger
 
 DATA_DIR = "data"
 AUTH_PATH = os.path.join(DATA_DIR, "admin_auth.json")
 ELG_PRIV_PATH = os.path.join(DATA_DIR, "elgamal_priv.json")
 os.makedirs(DATA_DIR, exist_ok=True)
 
+log = get_logger("admin_auth")
+
 
 def _save_json_atomic(path, obj):
     tmp = path + ".tmp"
@@ -25,7 +27,8 @@ def _save_json_atomic(path, obj):
             json.dump(obj, f, indent=2)
         os.replace(tmp, path)
         return True
-    except Exception:
+    except Exception as e:
+        log.error("Could not save", path=path, error=e)
         if os.path.exists(tmp):
             try:
                 os.unlink(tmp)
@@ -145,7 +148,7 @@ def set_new_password(root, new_password=None, confirm_password=None):
             done["ok"] = True
         except Exception as e:
             done["error"] = e
-            traceback.print_exc()
+            log.exception("Setting the admin password failed")
 
     t = threading.Thread(target=worker, daemon=True)
     t.start()
@@ -175,7 +178,8 @@ def _load_auth():
         with open(ELG_PRIV_PATH, "r") as f:
             priv = json.load(f)
         return auth, priv
-    except:
+    except Exception as e:
+        log.error("Unreadable authentication data", error=e)
         return None
 
 
@@ -211,6 +215,7 @@ def verify_password_dialog(root, entered_password=None, max_tries=3):
         stored_password = cipher.decrypt_and_verify(ciphertext, tag)
 
     except Exception as e:
+        log.error("Failed to load authentication data", error=e)
         messagebox.showerror("Error", f"Failed to load authentication data: {e}", parent=root)
         return False
 
@@ -226,6 +231,7 @@ def verify_password_dialog(root, entered_password=None, max_tries=3):
         if entry.encode("utf-8") == stored_password:
             return True
         remaining = max_tries - attempt - 1
+        log.warning("Admin login failed", remaining=remaining)
         if remaining > 0:
             messagebox.showwarning("Wrong password", f"Incorrect password. {remaining} tries left.", parent=root)
         else:
@@ -1,15 +1,18 @@
 # futuristic_admin_panel.py
 import tkinter as tk
-from tkinter import messagebox, simpledialog, scrolledtext
-import json, os, threading, subprocess, sys
-from register import capture_face_and_register
+from tkinter import messagebox, simpledialog
+import os, threading
+from register import capture_face_and_register, open_store, private_key
 import admin_auth
+import access_log
+from log_query import LogQuery
+from ann_index import update_index_file
+import monitor_control
 from PIL import Image, ImageTk, ImageDraw
-import time
 
 DATA_DIR = "data"
-DB_PATH = os.path.join(DATA_DIR, "faces.json")
-LOG_PATH = os.path.join(DATA_DIR, "logs.json")
+LOG_DIR = os.path.join(DATA_DIR, "logs")
+INDEX_PATH = os.path.join(DATA_DIR, "faces.index.npz")
 
 
 # --- Utility Decorator for Threading ---
@@ -66,6 +69,52 @@ class LoadingOverlay:
         self.top.destroy()
 
 
+class LogListView:
+    """Newest-first access log list that fetches pages only as they scroll into view."""
+    PAGE_SIZE = 100
+
+    def __init__(self, parent, query, user=None):
+        self.query = query
+        self.user = user
+        self.cursor = None
+        self.exhausted = False
+        self.loaded = 0
+
+        self.scrollbar = tk.Scrollbar(parent, bg="#0a1628", troughcolor="#010118")
+        self.listbox = tk.Listbox(parent, font=("Consolas", 11), bg="#0a1628", fg="#00ffff",
+                                  selectbackground="#00d9ff", selectforeground="#010118",
+                                  relief="flat", borderwidth=0, highlightthickness=0,
+                                  activestyle="none", yscrollcommand=self.on_scroll)
+        self.scrollbar.configure(command=self.listbox.yview)
+        self.scrollbar.pack(side="right", fill="y", pady=10)
+        self.listbox.pack(side="left", fill="both", expand=True, padx=10, pady=10)
+        self.load_more()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # prefetch the next page once the view nears the end of what is loaded
+        if float(last) > 0.9 and not self.exhausted:
+            self.listbox.after_idle(self.load_more)
+
+    def load_more(self):
+        if self.exhausted or not self.listbox.winfo_exists():
+            return
+        try:
+            entries, self.cursor = self.query.page(self.cursor, self.PAGE_SIZE, user=self.user)
+        except Exception as e:
+            entries, self.cursor = [], None
+            self.listbox.insert("end", f"Error: {e}")
+        self.exhausted = self.cursor is None
+        for entry in entries:
+            if entry.get("event") == "intrusion":
+                self.listbox.insert("end", f"{entry['time']} - unknown face ({entry['evidence']})")
+            else:
+                self.listbox.insert("end", f"{entry['time']} - {entry['user']}")
+        self.loaded += len(entries)
+        if self.exhausted and self.loaded == 0:
+            self.listbox.insert("end", "No log entries found.")
+
+
 # --- Circular Button Class ---
 class CircularButton:
     def __init__(self, canvas, x, y, image_path, text, command,
@@ -331,43 +380,41 @@ class AdminPanel:
                                    highlightbackground="#00d9ff", highlightthickness=2)
         users_container.pack(padx=50, pady=20, fill="both", expand=True)
 
-        if not os.path.exists(DB_PATH):
-            tk.Label(users_container, text="No users found", bg="#010118",
-                     fg="#888", font=("Courier New", 16)).pack(pady=50)
-        else:
-            try:
-                with open(DB_PATH) as f:
-                    db = json.load(f)
-                users = list(db.get("users", {}).keys())
-                for uname in users:
-                    row = tk.Frame(users_container, bg="#0a1628",
-                                   highlightbackground="#00d9ff", highlightthickness=1)
-                    row.pack(padx=20, pady=10, fill="x")
-                    tk.Label(row, text="👤", bg="#0a1628", fg="#00d9ff", font=("Arial", 20)).pack(side="left", padx=10)
-                    tk.Label(row, text=uname, bg="#0a1628", fg="#00ffff",
-                             font=("Courier New", 14, "bold")).pack(side="left", padx=10)
-
-                    def delete_user(u=uname):
-                        if messagebox.askyesno("Confirm", f"Delete {u}?"):
-                            try:
-                                del db["users"][u]
-                                with open(DB_PATH, "w") as f:
-                                    json.dump(db, f, indent=2)
-                                messagebox.showinfo("Deleted", f"{u} removed.")
-                                self.show_users()
-                            except Exception as e:
-                                messagebox.showerror("Error", str(e))
-
-                    tk.Button(row, text="❌ DELETE", command=delete_user,
-                              bg="#ff0033", fg="white", font=("Arial", 10, "bold"),
-                              relief="flat", padx=15, pady=5, cursor="hand2").pack(side="right", padx=10, pady=5)
-            except Exception as e:
-                tk.Label(users_container, text=f"Error: {e}", bg="#010118", fg="#ff0033",
-                         font=("Courier New", 12)).pack(pady=50)
+        try:
+            store = open_store()
+            users = store.names()
+            if not users:
+                tk.Label(users_container, text="No users found", bg="#010118",
+                         fg="#888", font=("Courier New", 16)).pack(pady=50)
+            for uname in users:
+                row = tk.Frame(users_container, bg="#0a1628",
+                               highlightbackground="#00d9ff", highlightthickness=1)
+                row.pack(padx=20, pady=10, fill="x")
+                tk.Label(row, text="👤", bg="#0a1628", fg="#00d9ff", font=("Arial", 20)).pack(side="left", padx=10)
+                tk.Label(row, text=uname, bg="#0a1628", fg="#00ffff",
+                         font=("Courier New", 14, "bold")).pack(side="left", padx=10)
+
+                def delete_user(u=uname):
+                    if messagebox.askyesno("Confirm", f"Delete {u}?"):
+                        try:
+                            store.delete(u)
+                            store.maybe_compact()
+                            update_index_file(INDEX_PATH, store.unlock(private_key), removed=[u])
+                            messagebox.showinfo("Deleted", f"{u} removed.")
+                            self.show_users()
+                        except Exception as e:
+                            messagebox.showerror("Error", str(e))
+
+                tk.Button(row, text="❌ DELETE", command=delete_user,
+                          bg="#ff0033", fg="white", font=("Arial", 10, "bold"),
+                          relief="flat", padx=15, pady=5, cursor="hand2").pack(side="right", padx=10, pady=5)
+        except Exception as e:
+            tk.Label(users_container, text=f"Error: {e}", bg="#010118", fg="#ff0033",
+                     font=("Courier New", 12)).pack(pady=50)
 
         self.slide_in(self.content_frame)
 
-    # --- LOGS SCREEN (UNCHANGED) ---
+    # --- LOGS SCREEN ---
     def show_logs(self):
         self.clear_content()
         self.current_screen = "logs"
@@ -384,8 +431,7 @@ class AdminPanel:
 
         def clear_logs():
             if messagebox.askyesno("Confirm", "Clear all logs?"):
-                with open(LOG_PATH, "w") as f:
-                    json.dump([], f)
+                access_log.clear_logs(LOG_DIR)
                 messagebox.showinfo("Cleared", "Logs cleared.")
                 self.show_logs()
 
@@ -397,26 +443,23 @@ class AdminPanel:
                               highlightbackground="#00d9ff", highlightthickness=2)
         logs_frame.pack(padx=50, pady=20, fill="both", expand=True)
 
-        txt = scrolledtext.ScrolledText(logs_frame, wrap="word", font=("Consolas", 11),
-                                        bg="#0a1628", fg="#00ffff", insertbackground="#00ffff",
-                                        relief="flat", borderwidth=0)
-        txt.pack(fill="both", expand=True, padx=10, pady=10)
+        query = LogQuery(LOG_DIR)
+        LogListView(logs_frame, query)
 
-        if os.path.exists(LOG_PATH):
-            try:
-                with open(LOG_PATH) as f:
-                    logs = json.load(f)
-                if logs:
-                    for entry in reversed(logs):
-                        txt.insert("end", f"{entry['time']} - {entry['user']}\n")
-                else:
-                    txt.insert("end", "No log entries found.")
-            except Exception as e:
-                txt.insert("end", f"Error: {e}")
-        else:
-            txt.insert("end", "No logs yet.")
+        def apply_filter():
+            user = filter_entry.get().strip() or None
+            for child in logs_frame.winfo_children():
+                child.destroy()
+            LogListView(logs_frame, query, user=user)
+
+        filter_entry = tk.Entry(header, bg="#010118", fg="#00ffff", font=("Courier New", 12),
+                                insertbackground="#00d9ff", relief="solid", borderwidth=1, width=16)
+        filter_entry.pack(side="left", padx=(20, 5))
+        filter_entry.bind("<Return>", lambda e: apply_filter())
+        tk.Button(header, text="🔍 FILTER USER", command=apply_filter, bg="#0a1628",
+                  fg="#00d9ff", font=("Arial", 12, "bold"), relief="flat",
+                  padx=10, pady=8, cursor="hand2").pack(side="left")
 
-        txt.configure(state="disabled")
         self.slide_in(self.content_frame)
 
     # --- PASSWORD SCREEN (FIXED) ---
@@ -517,19 +560,71 @@ class AdminPanel:
         tk.Label(header, text="FACE RECOGNITION MONITOR", bg="#0a1628", fg="#00d9ff",
                  font=("Courier New", 24, "bold")).pack(side="left")
         
-        @threaded
-        def run_monitor():
+        status_var = tk.StringVar(value="Checking monitor status...")
+        tk.Label(self.content_frame, textvariable=status_var, bg="#0a1628", fg="#888",
+                 font=("Courier New", 12)).pack(pady=(0, 10))
+
+        def refresh_status():
+            if self.current_screen != "monitor" or not self.content_frame.winfo_exists():
+                return
             try:
-                overlay = LoadingOverlay(self.root, "Starting Face Recognition Monitor...")
-                subprocess.Popen([sys.executable, "monitor.py"])
-                time.sleep(8) 
+                st = monitor_control.send("status", timeout=0.3)
+                text = f"State: {st['state'].upper()}"
+                if st.get("users") is not None:
+                    text += f"  |  Users: {st['users']}"
+                if st.get("user"):
+                    text += f"  |  Present: {st['user']}"
+            except (OSError, ValueError):
+                text = "State: NOT RUNNING"
+            status_var.set(text)
+            self.root.after(1000, refresh_status)
+
+        def run_monitor():
+            overlay = LoadingOverlay(self.root, "Starting Face Recognition Monitor...")
+
+            def finish(error):
                 overlay.close()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to start monitor:\n{e}")
+                if error:
+                    messagebox.showerror("Error", f"Failed to start monitor:\n{error}")
+
+            @threaded
+            def start():
+                # reuse a running daemon (models and gallery already loaded);
+                # otherwise spawn one and wait for its ready signal
+                try:
+                    proc = monitor_control.spawn()
+                    if proc is None:
+                        monitor_control.send("start")
+                    if not monitor_control.wait_ready(timeout=120.0, proc=proc):
+                        error = "Monitor exited or did not become ready"
+                    elif monitor_control.send("status")["state"] == "error":
+                        error = "Monitor is up but could not open the camera"
+                    else:
+                        error = None
+                except Exception as e:
+                    error = e
+                self.root.after(0, lambda: finish(error))
+            start()
+
+        def control(cmd):
+            try:
+                monitor_control.send(cmd)
+            except (OSError, ValueError):
+                messagebox.showinfo("Monitor", "The monitor is not running.")
 
         tk.Button(self.content_frame, text="▶ START MONITORING", command=run_monitor,
                   bg="#ff4500", fg="white", font=("Courier New", 16, "bold"),
-                  relief="flat", padx=20, pady=15, cursor="hand2").pack(padx=50, pady=40, fill="x")
+                  relief="flat", padx=20, pady=15, cursor="hand2").pack(padx=50, pady=(40, 10), fill="x")
+
+        controls = tk.Frame(self.content_frame, bg="#0a1628")
+        controls.pack(padx=50, pady=(0, 40), fill="x")
+        for label, cmd in (("⏸ PAUSE", "pause"), ("⏵ RESUME", "resume"),
+                           ("⟳ RELOAD GALLERY", "reload"), ("■ STOP", "stop")):
+            tk.Button(controls, text=label, command=lambda c=cmd: control(c),
+                      bg="#003355", fg="white", font=("Courier New", 12, "bold"),
+                      relief="flat", padx=10, pady=8, cursor="hand2").pack(side="left", expand=True, fill="x", padx=5)
+
+        refresh_status()
         self.slide_in(self.content_frame)
 
 
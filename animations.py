@@ -1,19 +1,25 @@
 # animations.py
 import tkinter as tk
-from PIL import Image, ImageTk, ImageGrab, ImageEnhance
-import time
+from PIL import ImageTk
+from screen_capture import shared_backdrop
+from overlay import Animator
 
 class WelcomeOverlay:
-    def __init__(self, username, duration=2.5):
-        # create Tk root for this process
-        self.root = tk.Tk()
+    FADE_SECONDS = 0.26
+
+    def __init__(self, username, duration=2.5, master=None):
+        # own a Tk root when standalone; the welcome server passes its
+        # long-lived root so each welcome is just a Toplevel
+        self.owns_root = master is None
+        self.root = tk.Tk() if master is None else tk.Toplevel(master)
         self.root.attributes("-fullscreen", True)
         self.root.attributes("-topmost", True)
         self.root.overrideredirect(True)
+        self.root.attributes("-alpha", 0.0)
+        self.animator = Animator(self.root)
 
-        # capture screen and darken it
-        screenshot = ImageGrab.grab()
-        darkened = ImageEnhance.Brightness(screenshot).enhance(0.28)
+        # capture screen and darken it (cached grab shared with LockOverlay)
+        darkened = shared_backdrop().get(brightness=0.28)
 
         # store PhotoImage on self to avoid GC
         self.bg_img = ImageTk.PhotoImage(darkened)
@@ -46,27 +52,33 @@ class WelcomeOverlay:
 
         self.duration = duration
 
-    def show(self):
-        # fade-in
-        for i in range(0, 101, 8):
-            self.root.attributes("-alpha", i/100)
-            self.root.update()
-            time.sleep(0.02)
+    def _alpha(self, a):
+        self.root.attributes("-alpha", a)
+
+    def play(self, on_done=None):
+        """Fade in, hold for `duration`, fade out and destroy; returns immediately."""
+        def finish():
+            self.close()
+            if on_done:
+                on_done()
 
-        # optionally add a simple pulsing/text scale
-        # (lightweight: scale text by changing font size)
-        # pause for duration
-        start = time.time()
-        while time.time() - start < self.duration:
-            # pulse effect: small sinusoidal size variation
-            # keep it simple to avoid heavy CPU in animation
-            self.root.update()
-            time.sleep(0.02)
+        def fade_out():
+            self.animator.run("fade", self.FADE_SECONDS, lambda p: self._alpha(1.0 - p), finish)
 
-        # fade-out
-        for i in range(100, -1, -8):
-            self.root.attributes("-alpha", i/100)
-            self.root.update()
-            time.sleep(0.02)
+        def hold():
+            self.animator.run("hold", self.duration, lambda p: None, fade_out)
 
-        self.root.destroy()
+        self.animator.run("fade", self.FADE_SECONDS, self._alpha, hold)
+
+    def close(self):
+        self.animator.cancel_all()
+        try:
+            self.root.destroy()
+        except tk.TclError:
+            pass
+
+    def show(self):
+        """Blocking playback for a standalone process."""
+        self.play()
+        if self.owns_root:
+            self.root.mainloop()
@@ -0,0 +1,56 @@
+# bench_access_log.py
+"""Cost of logging an access event, against logs of different sizes.
+
+`log()` is what the decision stage pays (an enqueue); `flush` is the time
+until the entry is fsynced by the writer thread. Both should stay flat as
+the log grows, unlike the old read-modify-write logs.json.
+"""
+import os
+import time
+import common
+from common import result, percentiles, scratch_dir
+from access_log import AccessLogWriter, encode_entry, make_entry, segment_name
+
+QUICK_SIZES = (0, 10000)
+FULL_SIZES = (0, 10000, 100000, 1000000)
+
+
+def prefill(log_dir, n):
+    """Write n historical entries into one old segment."""
+    if n == 0:
+        return
+    start = time.time() - 30 * 24 * 3600
+    with open(os.path.join(log_dir, segment_name(start)), "w") as f:
+        for i in range(n):
+            f.write(encode_entry(make_entry(f"user{i % 50}", ts=start + i, status="granted")))
+
+
+def run(quick=False, **_):
+    results = []
+    events = 200 if quick else 1000
+    for n in (QUICK_SIZES if quick else FULL_SIZES):
+        with scratch_dir() as d:
+            prefill(d, n)
+            writer = AccessLogWriter(d).start()
+            enqueue, flushed = [], []
+            for i in range(events):
+                start = time.perf_counter()
+                writer.log(f"user{i % 50}", status="granted")
+                mid = time.perf_counter()
+                if i % 10 == 0:
+                    writer.flush()
+                    flushed.append(time.perf_counter() - mid)
+                enqueue.append(mid - start)
+            writer.close()
+            p50, p99 = percentiles(enqueue)
+            results.append(result("access_log.log_p50", p50 * 1e6, "us", entries=n))
+            results.append(result("access_log.log_p99", p99 * 1e6, "us", entries=n))
+            p50, p99 = percentiles(flushed)
+            results.append(result("access_log.flush_p50", p50 * 1000.0, "ms", entries=n))
+            results.append(result("access_log.flush_p99", p99 * 1000.0, "ms", entries=n))
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        print(f"{common.describe(r):50} {r['value']:>12.3f} {r['unit']}")
@@ -0,0 +1,32 @@
+# bench_crypto.py
+"""Per-record (legacy RSA+CBC) and batch (envelope AES-GCM) encryption throughput."""
+import common
+from common import result, best_of, embeddings, rsa_keys
+from crypto_utils import decrypt_encoding, decrypt_encodings, encrypt_encoding, encrypt_encodings
+
+
+def run(quick=False, **_):
+    priv, pub = rsa_keys()
+    results = []
+
+    n = 20 if quick else 100
+    vecs = embeddings(n).astype("float64")  # legacy records store face_recognition's float64
+    sealed = [encrypt_encoding(v, pub) for v in vecs]
+    t = best_of(lambda: [encrypt_encoding(v, pub) for v in vecs], repeat=3)
+    results.append(result("crypto.encrypt_encoding", n / t, "records/s", "higher"))
+    t = best_of(lambda: [decrypt_encoding(s, priv) for s in sealed], repeat=3)
+    results.append(result("crypto.decrypt_encoding", n / t, "records/s", "higher"))
+
+    n = 1000 if quick else 10000
+    batch = {f"user{i}": v for i, v in enumerate(embeddings(n))}
+    sealed = encrypt_encodings(batch, pub)
+    t = best_of(lambda: encrypt_encodings(batch, pub), repeat=3)
+    results.append(result("crypto.encrypt_encodings", n / t, "records/s", "higher", records=n))
+    t = best_of(lambda: decrypt_encodings(sealed, priv), repeat=3)
+    results.append(result("crypto.decrypt_encodings", n / t, "records/s", "higher", records=n))
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        print(f"{common.describe(r):50} {r['value']:>12.1f} {r['unit']}")
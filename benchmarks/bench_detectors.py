@@ -0,0 +1,126 @@
+# bench_detectors.py
+"""Latency and recall of each face detector backend on labelled images.
+
+The image directory holds the pictures plus a labels.json mapping each file
+name to its ground-truth boxes, [[top, right, bottom, left], ...]:
+
+    python benchmarks/bench_detectors.py path/to/images --backends hog haar dnn
+
+A detection counts as a hit when it overlaps an unclaimed ground-truth box
+with IoU >= --iou. Backends whose model files are missing are reported and
+skipped.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import load_config  # noqa: E402
+from detectors import BACKENDS, make_backend  # noqa: E402
+from tracker import iou  # noqa: E402
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_dataset(image_dir):
+    with open(os.path.join(image_dir, "labels.json"), "r") as f:
+        labels = json.load(f)
+    dataset = []
+    for name in sorted(labels):
+        if not name.lower().endswith(IMAGE_EXTS):
+            continue
+        bgr = cv2.imread(os.path.join(image_dir, name))
+        if bgr is None:
+            print(f"[!] Skipping unreadable image {name}")
+            continue
+        dataset.append((name, cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB), [tuple(b) for b in labels[name]]))
+    return dataset
+
+
+def score(detected, truth, threshold):
+    """(true positives, false positives) with greedy one-to-one matching."""
+    unclaimed = list(truth)
+    hits = 0
+    for box in detected:
+        best = max(unclaimed, key=lambda t: iou(box, t), default=None)
+        if best is not None and iou(box, best) >= threshold:
+            unclaimed.remove(best)
+            hits += 1
+    return hits, len(detected) - hits
+
+
+def scaled(rgb, scale):
+    if scale == 1.0:
+        return rgb
+    h, w = rgb.shape[:2]
+    return cv2.resize(rgb, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def bench_backend(backend, dataset, scale=1.0, repeat=3, iou_threshold=0.5):
+    latencies, hits, false_pos, total = [], 0, 0, 0
+    backend.detect(scaled(dataset[0][1], scale))  # warm-up (model init, caches)
+    for _, rgb, truth in dataset:
+        small = scaled(rgb, scale)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            boxes = backend.detect(small)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+        inv = 1.0 / scale
+        boxes = [tuple(int(v * inv) for v in b) for b in boxes]
+        tp, fp = score(boxes, truth, iou_threshold)
+        hits, false_pos, total = hits + tp, false_pos + fp, total + len(truth)
+    p50, p90, p99 = (float(v) for v in np.percentile(latencies, [50, 90, 99]))
+    return {
+        "images": len(dataset),
+        "p50_ms": round(p50, 2),
+        "p90_ms": round(p90, 2),
+        "p99_ms": round(p99, 2),
+        "fps_p50": round(1000.0 / p50, 1) if p50 else None,
+        "recall": round(hits / total, 4) if total else None,
+        "false_positives": false_pos,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("image_dir")
+    parser.add_argument("--backends", nargs="+", default=sorted(BACKENDS), choices=sorted(BACKENDS))
+    parser.add_argument("--scale", type=float, default=None,
+                        help="downscale factor before detection (default: detection.scale)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per image")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU needed to count a hit")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    cfg = load_config()["detection"]
+    scale = cfg["scale"] if args.scale is None else args.scale
+    dataset = load_dataset(args.image_dir)
+    if not dataset:
+        raise SystemExit(f"No labelled images in {args.image_dir}")
+
+    results = {}
+    print(f"{'backend':8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'fps':>6} {'recall':>7} {'fp':>5}")
+    for kind in args.backends:
+        try:
+            backend = make_backend(kind, **(cfg.get(kind) or {}))
+        except (ImportError, OSError, cv2.error) as e:
+            print(f"{kind:8} skipped: {e}")
+            results[kind] = {"skipped": str(e)}
+            continue
+        r = results[kind] = bench_backend(backend, dataset, scale, args.repeat, args.iou)
+        print(f"{kind:8} {r['p50_ms']:8.2f} {r['p90_ms']:8.2f} {r['p99_ms']:8.2f} "
+              f"{r['fps_p50'] or 0:6.1f} {r['recall'] or 0:7.3f} {r['false_positives']:5d}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scale": scale, "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
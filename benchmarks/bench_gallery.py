@@ -0,0 +1,77 @@
+# bench_gallery.py
+"""Gallery cold-load time (RSA unwrap + mmap + AES-GCM pass + matcher build) by size."""
+import os
+import json
+import time
+import numpy as np
+import common
+from common import result, best_of, embeddings, rsa_keys, scratch_dir
+from crypto_utils import NONCE_BYTES, TAG_BYTES, seal_record
+from gallery_store import GalleryStore, HEADER_SIZE, STATE_LIVE, slot_dtype
+from matcher import GalleryMatcher
+
+QUICK_SIZES = (10, 100, 1000)
+FULL_SIZES = (10, 100, 1000, 10000, 100000)
+
+
+def build_gallery(path, n, public_key):
+    """Write an n-user gallery in one pass.
+
+    Same on-disk records as GalleryStore.put, without its per-record lock and
+    fsync, which would dominate setup for the large sizes.
+    """
+    store = GalleryStore(path)
+    data_key = store.create(public_key)
+    vecs = embeddings(n)
+    names = [f"user{i:06d}" for i in range(n)]
+    slots = np.zeros(n, dtype=slot_dtype(vecs.shape[1]))
+    for i, (name, vec) in enumerate(zip(names, vecs)):
+        blob = seal_record(data_key, name, vec)
+        slots[i]["state"] = STATE_LIVE
+        slots[i]["nonce"] = np.frombuffer(blob[:NONCE_BYTES], np.uint8)
+        slots[i]["tag"] = np.frombuffer(blob[NONCE_BYTES:NONCE_BYTES + TAG_BYTES], np.uint8)
+        slots[i]["ct"] = np.frombuffer(blob[NONCE_BYTES + TAG_BYTES:], np.uint8)
+    with open(path, "r+b") as f:
+        f.seek(HEADER_SIZE)
+        f.write(slots.tobytes())
+    with open(store.idx_path, "a") as f:
+        f.writelines(json.dumps({"op": "put", "name": name, "slot": i, "meta": {}}) + "\n"
+                     for i, name in enumerate(names))
+    return store
+
+
+def run(quick=False, **_):
+    priv, pub = rsa_keys()
+    results = []
+    with scratch_dir() as d:
+        for n in (QUICK_SIZES if quick else FULL_SIZES):
+            path = os.path.join(d, f"faces-{n}.gal")
+            build_gallery(path, n, pub)
+            timings = {}
+
+            def load():
+                start = time.perf_counter()
+                gallery = GalleryStore(path).load(priv)  # fresh store: pays the RSA unwrap
+                mid = time.perf_counter()
+                GalleryMatcher(list(gallery.keys()), list(gallery.values()))
+                end = time.perf_counter()
+                timings.setdefault("decrypt", []).append(mid - start)
+                timings.setdefault("matcher", []).append(end - mid)
+
+            total = best_of(load, repeat=3)
+            results.append(result("gallery.load", total * 1000.0, "ms", users=n))
+            results.append(result("gallery.decrypt", min(timings["decrypt"]) * 1000.0, "ms", users=n))
+            results.append(result("gallery.matcher_build", min(timings["matcher"]) * 1000.0, "ms", users=n))
+
+        # Enrolment goes through put(), with its lock and fsync per user.
+        store = GalleryStore(os.path.join(d, "enrol.gal"))
+        store.create(pub)
+        vecs = embeddings(20 if quick else 100, seed=1)
+        t = best_of(lambda: [store.put(f"new{i}", v, priv) for i, v in enumerate(vecs)], repeat=1)
+        results.append(result("gallery.put", t / len(vecs) * 1000.0, "ms"))
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        print(f"{common.describe(r):50} {r['value']:>12.3f} {r['unit']}")
@@ -0,0 +1,45 @@
+# bench_matching.py
+"""GalleryMatcher.match latency by gallery size, faces per frame and index type."""
+import numpy as np
+import common
+from common import result, best_of, embeddings
+from matcher import GalleryMatcher
+from ann_index import make_index
+from config import DEFAULTS
+
+QUICK_SIZES = (100, 1000, 10000)
+FULL_SIZES = (100, 1000, 10000, 100000)
+FACES = (1, 4, 16)
+INDEXES = ("brute", "kdtree", "ivf")
+
+
+def queries(gallery, faces, seed=2):
+    """Noisy copies of enrolled users, i.e. faces that should match."""
+    rng = np.random.default_rng(seed)
+    rows = gallery[rng.integers(0, len(gallery), faces)]
+    return rows + rng.normal(0.0, 0.02, size=rows.shape).astype(np.float32)
+
+
+def run(quick=False, **_):
+    top_k = DEFAULTS["matcher"]["top_k"]
+    results = []
+    for n in (QUICK_SIZES if quick else FULL_SIZES):
+        gallery = embeddings(n)
+        names = [f"user{i}" for i in range(n)]
+        for kind in INDEXES:
+            if kind != "brute" and n < 1000:
+                continue  # partitioned indexes only pay off on larger galleries
+            index = make_index(kind, **DEFAULTS["matcher"].get(kind, {}))
+            matcher = GalleryMatcher(names, gallery, index=index)
+            for faces in FACES:
+                q = queries(gallery, faces)
+                rounds = 20
+                t = best_of(lambda: [matcher.match(q, k=top_k) for _ in range(rounds)])
+                results.append(result("matching.match", t / rounds * 1000.0, "ms",
+                                      users=n, faces=faces, index=kind))
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        print(f"{common.describe(r):60} {r['value']:>10.3f} {r['unit']}")
@@ -0,0 +1,68 @@
+# bench_pipeline.py
+"""End-to-end frame latency of the monitor's pipeline on recorded video.
+
+Each video is played back at its own frame rate, as a camera would deliver
+it, through the same FramePipeline and Recognizer the monitor runs (via
+replay.py), against a synthetic gallery. Latency is capture timestamp ->
+recognition result. Skipped when no videos are given or face_recognition is
+not installed.
+"""
+import os
+import glob
+import common
+from common import result
+from config import load_config
+from frame_sources import VideoFileSource
+from metrics import Metrics
+
+VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
+VIDEO_EXTS = (".mp4", ".avi", ".mkv", ".mov")
+
+
+def find_videos(videos=None):
+    if videos:
+        return list(videos)
+    return sorted(p for p in glob.glob(os.path.join(VIDEO_DIR, "*")) if p.lower().endswith(VIDEO_EXTS))
+
+
+def run(quick=False, videos=None, **_):
+    videos = find_videos(videos)
+    if not videos:
+        print("[!] pipeline: no videos given and none in benchmarks/videos/, skipping")
+        return []
+    try:
+        from recognition import Recognizer
+        from replay import replay, synthetic_gallery
+    except ImportError as e:
+        print(f"[!] pipeline: {e}, skipping")
+        return []
+
+    cfg = load_config()
+    results = []
+    for path in videos:
+        source = VideoFileSource(path, realtime=True)
+        if not source.isOpened():
+            print(f"[!] pipeline: cannot open {path}")
+            continue
+        recognizer = Recognizer(synthetic_gallery(100), cfg, Metrics())
+        report = replay(source, recognizer, cfg["pipeline"], lossless=False)
+        if not report["frames_recognised"]:
+            print(f"[!] pipeline: no frames recognised from {path}")
+            continue
+        name = os.path.basename(path)
+        latency = report["latency_ms"]
+        results.append(result("pipeline.latency_p50", latency["p50"], "ms", video=name))
+        results.append(result("pipeline.latency_p99", latency["p99"], "ms", video=name))
+        results.append(result("pipeline.results_per_s", report["fps"], "fps", "higher", video=name))
+        results.append(result("pipeline.dropped_frames", report["frames_dropped"], "frames", video=name))
+        for stage in ("detect", "encode", "match"):
+            summary = report["stages"].get(stage, {})
+            if summary.get("count"):
+                results.append(result(f"pipeline.{stage}_p50", summary["p50_ms"], "ms", video=name))
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    for r in run(videos=sys.argv[1:]):
+        print(f"{common.describe(r):60} {r['value']:>10.3f} {r['unit']}")
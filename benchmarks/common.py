@@ -0,0 +1,95 @@
+# common.py
+"""Shared helpers for the benchmark suite: timing, result records, baselines."""
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import contextlib
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+EMBEDDING_DIM = 128
+
+
+def result(name, value, unit, better="lower", **params):
+    """One measurement. `better` says which direction is an improvement."""
+    return {"name": name, "params": params, "value": round(float(value), 4), "unit": unit, "better": better}
+
+
+def key(r):
+    return r["name"] + json.dumps(r["params"], sort_keys=True)
+
+
+def best_of(fn, repeat=5):
+    """Fastest of `repeat` runs of fn(), in seconds (least disturbed by noise)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def percentiles(samples, qs=(50, 99)):
+    return [float(v) for v in np.percentile(samples, qs)]
+
+
+def embeddings(n, seed=0):
+    """Synthetic face embeddings with roughly the spread of real dlib ones."""
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(0.0, 0.09, size=(n, EMBEDDING_DIM)).astype(np.float32)
+    return vecs
+
+
+_keys = None
+
+
+def rsa_keys():
+    """A throwaway RSA key pair, generated once per run."""
+    global _keys
+    if _keys is None:
+        from Crypto.PublicKey import RSA
+        key = RSA.generate(2048)
+        _keys = key, key.publickey()
+    return _keys
+
+
+@contextlib.contextmanager
+def scratch_dir():
+    with tempfile.TemporaryDirectory(prefix="sentinel-bench-") as d:
+        yield d
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Regressions of `results` against `baseline` beyond `tolerance` (0.25 = 25%)."""
+    previous = {key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get(key(r))
+        if old is None or not old["value"]:
+            continue
+        ratio = r["value"] / old["value"]
+        worse = ratio > 1 + tolerance if r["better"] == "lower" else ratio < 1 - tolerance
+        if worse:
+            regressions.append((r, old, ratio))
+    return regressions
+
+
+def describe(r):
+    params = ", ".join(f"{k}={v}" for k, v in r["params"].items())
+    return f"{r['name']}({params})"
@@ -0,0 +1,88 @@
+# run_all.py
+"""Run the benchmark suite, write JSON results and gate against a baseline.
+
+    python benchmarks/run_all.py --quick                      # CI-sized run
+    python benchmarks/run_all.py --save-baseline              # record this machine's numbers
+    python benchmarks/run_all.py --quick --baseline benchmarks/baseline.json --tolerance 0.3
+
+Exits 1 when any result is worse than the baseline by more than the
+tolerance. Everything runs on synthetic data; no camera is needed, and the
+pipeline benchmark only runs when recorded videos are available.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import common
+import bench_crypto
+import bench_gallery
+import bench_matching
+import bench_access_log
+import bench_pipeline
+
+SUITES = {
+    "crypto": bench_crypto,
+    "gallery": bench_gallery,
+    "matching": bench_matching,
+    "access_log": bench_access_log,
+    "pipeline": bench_pipeline,
+}
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+RESULTS_PATH = os.path.join(HERE, "results.json")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--only", nargs="+", choices=sorted(SUITES), help="run just these suites")
+    ap.add_argument("--quick", action="store_true", help="smaller sizes, for CI")
+    ap.add_argument("--video", nargs="+", help="video files for the pipeline benchmark "
+                                               "(default: benchmarks/videos/*)")
+    ap.add_argument("--out", default=RESULTS_PATH, help="where to write the JSON results")
+    ap.add_argument("--baseline", default=BASELINE_PATH, help="results to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="allowed slowdown as a fraction of the baseline (default 0.25)")
+    ap.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    args = ap.parse_args(argv)
+
+    results = []
+    for name in args.only or SUITES:
+        print(f"[*] {name}")
+        start = time.perf_counter()
+        found = SUITES[name].run(quick=args.quick, videos=args.video)
+        for r in found:
+            print(f"    {common.describe(r):60} {r['value']:>12.3f} {r['unit']}")
+        print(f"    ({time.perf_counter() - start:.1f}s)")
+        results.extend(found)
+
+    report = {"created": time.time(), "quick": args.quick,
+              "environment": common.environment(), "results": results}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[+] Wrote {len(results)} results to {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("[*] No baseline to compare against; run with --save-baseline first")
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("quick") != args.quick:
+        print("[!] Baseline was recorded with a different --quick setting; sizes may not line up")
+    regressions = common.compare(results, baseline, args.tolerance)
+    for r, old, ratio in regressions:
+        print(f"[!] Regression: {common.describe(r)} {old['value']} -> {r['value']} {r['unit']} ({ratio:.2f}x)")
+    if regressions:
+        return 1
+    print(f"[+] No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
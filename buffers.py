@@ -0,0 +1,117 @@
+# buffers.py
+"""Reusable NumPy buffers for the frame path.
+
+At 30 fps on 1080p a fresh BGR frame, its RGB copy and the downscaled
+detection input add up to hundreds of MB/s of allocations. FramePool hands
+out frame-sized buffers and takes them back when the Frame that owns them
+is garbage collected, so a buffer is never recycled while any stage (a
+queue, a worker, the motion gate's cached result) still holds its frame.
+Scratch gives each thread its own working arrays (colour conversion,
+downscaling, motion differencing) that are overwritten on every frame.
+
+Both count allocations versus reuses; in steady state the allocation
+counters should stop moving.
+"""
+import threading
+import weakref
+import numpy as np
+
+
+def _key(shape, dtype):
+    return tuple(shape), np.dtype(dtype).str
+
+
+class FramePool:
+    """Frame buffers recycled when their owning Frame dies."""
+
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self._lock = threading.Lock()
+        self._free = {}  # (shape, dtype) -> [arrays]
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.reuses = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self._lock:
+            free = self._free.get(_key(shape, dtype))
+            if free:
+                self.reuses += 1
+                return free.pop()
+        array = np.empty(shape, dtype)
+        self.count(array)
+        return array
+
+    def count(self, array):
+        """Record an allocation made outside the pool (e.g. by a frame source)."""
+        with self._lock:
+            self.allocations += 1
+            self.allocated_bytes += array.nbytes
+
+    def release(self, array):
+        with self._lock:
+            free = self._free.setdefault(_key(array.shape, array.dtype), [])
+            if len(free) < self.max_free:
+                free.append(array)
+
+    def bind(self, owner, array):
+        """Give `array` back to the pool once `owner` is garbage collected."""
+        weakref.finalize(owner, self.release, array)
+
+    def stats(self):
+        with self._lock:
+            free = sum(len(v) for v in self._free.values())
+        return {"allocations": self.allocations, "allocated_bytes": self.allocated_bytes,
+                "reuses": self.reuses, "free": free}
+
+
+class Scratch:
+    """Per-thread working arrays, reused across frames.
+
+    `get(name, shape)` returns the thread's array for `name`, reallocating
+    only when the shape changes. `view(name, shape)` returns a contiguous
+    view into a flat buffer that only ever grows, for sizes that vary every
+    frame (ROIs). Arrays are overwritten by the next call on the same thread: copy
+    anything that must outlive the current frame.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.allocated_bytes = 0
+
+    def _arrays(self):
+        arrays = getattr(self._local, "arrays", None)
+        if arrays is None:
+            arrays = self._local.arrays = {}
+        return arrays
+
+    def _allocate(self, shape, dtype):
+        array = np.empty(shape, dtype)
+        with self._lock:
+            self.allocations += 1
+            self.allocated_bytes += array.nbytes
+        return array
+
+    def get(self, name, shape, dtype=np.uint8):
+        arrays = self._arrays()
+        array = arrays.get(name)
+        if array is None or array.shape != tuple(shape) or array.dtype != dtype:
+            array = arrays[name] = self._allocate(shape, dtype)
+        return array
+
+    def view(self, name, shape, dtype=np.uint8):
+        arrays = self._arrays()
+        flat = arrays.get(name)
+        size = int(np.prod(shape))
+        if flat is None or flat.dtype != dtype or flat.size < size:
+            flat = arrays[name] = self._allocate(size, dtype)
+        return flat[:size].reshape(shape)  # contiguous, as dlib requires
+
+    def stats(self):
+        return {"allocations": self.allocations, "allocated_bytes": self.allocated_bytes}
+
+
+# Shared by the recognition workers (detection, colour conversion, motion gate).
+scratch = Scratch()
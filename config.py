@@ -0,0 +1,156 @@
+import os
+import json
+import copy
+
+DATA_DIR = "data"
+CONFIG_PATH = os.path.join(DATA_DIR, "config.json")
+
+# Defaults for every tunable; data/config.json only needs the keys it overrides.
+DEFAULTS = {
+    "pipeline": {
+        "recognition_workers": 1,   # detection/encoding threads
+        "frame_queue_size": 1,      # frames waiting for a worker (stale ones are dropped)
+        "result_queue_size": 1,     # results waiting for the decision/UI stage
+        "camera_buffer_size": 1,    # driver-side buffer, keep it tiny so frames stay fresh
+        "ui_poll_ms": 1,            # cv2.waitKey delay in the decision/UI stage
+    },
+    "source": {
+        "uri": "camera:0",          # camera:N | video file | image directory | synthetic[:WxH]
+        "realtime": True,           # recorded sources play at their own frame rate
+        "loop": False,              # restart recorded sources at the end
+    },
+    "display": {
+        "headless": False,          # no preview window, lock overlay or welcome animation
+    },
+    "matcher": {
+        "top_k": 3,
+        "index": "brute",           # brute | kdtree | ivf; prefer brute, or ivf for large galleries
+        # kdtree is NOT recommended for 128-d face embeddings: at 1k-10k users it
+        # measured 10-20x slower than brute force. leaf_size shapes the tree;
+        # max_leaves caps leaves visited per query (None = exact, slower still)
+        "kdtree": {"leaf_size": 32, "max_leaves": 64},
+        # nlist None = sqrt(gallery size); raise nprobe for recall
+        "ivf": {"nlist": None, "nprobe": 8},
+    },
+    "gallery": {
+        "watch": True,              # pick up registrations/deletions without a restart
+        "poll_interval": 1.0,       # seconds between checks of faces.gal.idx
+    },
+    "detection": {
+        "backend": "hog",           # hog | cnn | haar | dnn
+        "scale": 0.5,               # detect on a frame downscaled by this factor
+        "roi_margin": 0.5,          # ROI = previous box grown by this fraction per side
+        "full_scan_every": 10,      # frames between full-frame scans
+        # upsample = dlib upsampling passes on the downscaled frame
+        "hog": {"upsample": 1},
+        "cnn": {"upsample": 1},
+        # cascade None = OpenCV's bundled haarcascade_frontalface_default.xml
+        "haar": {"cascade": None, "scale_factor": 1.1, "min_neighbors": 5, "min_size": 24},
+        # res10 SSD files are not shipped; place them under data/models/
+        "dnn": {
+            "prototxt": os.path.join(DATA_DIR, "models", "deploy.prototxt"),
+            "model": os.path.join(DATA_DIR, "models", "res10_300x300_ssd_iter_140000.caffemodel"),
+            "confidence": 0.5,
+        },
+    },
+    "encoding": {
+        "enabled": True,
+        "workers": None,            # encoder processes; None = one per core, minus one
+        "min_faces": 4,             # fewer faces than this are encoded in-process
+        "crop_margin": 0.5,         # context kept around each face for the landmark model
+        "start_method": "fork",     # workers inherit the loaded dlib models
+    },
+    "motion": {
+        "enabled": True,
+        "width": 160,               # working width for frame differencing
+        "pixel_threshold": 12,      # grey-level change that counts as motion
+        "min_changed": 0.01,        # fraction of changed pixels that triggers recognition
+        "max_staleness": 1.0,       # seconds; keep below GRACE_SECONDS in monitor.py
+    },
+    "tracker": {
+        "enabled": True,
+        "iou_threshold": 0.3,       # min box overlap to continue a track
+        "max_missed": 5,            # frames a lost face is kept before its track ends
+        "reverify_seconds": 1.0,    # re-encode matched faces at least this often
+        "drift_threshold": 0.5,     # appearance change (1 - correlation) forcing a re-encode
+        "cv_tracker": False,        # follow faces the detector misses with an OpenCV tracker
+    },
+    "embedding_cache": {
+        "enabled": True,            # only used with the tracker off; tracks cache identities themselves
+        "size": 64,                 # entries kept, least recently used evicted
+        "ttl": 1.0,                 # seconds a cached match may be reused; keep below GRACE_SECONDS
+        "hash_size": 8,             # difference hash of the face crop, hash_size^2 bits
+        "max_hamming": 6,           # differing hash bits still counted as the same crop
+        "max_shift": 0.15,          # centre movement, as a fraction of the box size
+        "max_scale": 0.15,          # relative change in box width/height
+    },
+    "governor": {
+        "enabled": True,
+        "idle_fps": 2.0,            # locked and nobody in view
+        "burst_fps": 30.0,          # new/unknown face, motion while locked, grace period
+        "verify_fps": 5.0,          # unlocked with the owner in view
+        "burst_seconds": 3.0,       # how long a burst lasts after its last trigger
+        "cpu_budget": None,         # e.g. 0.5 = recognition busy at most half of one core
+        "target_latency": None,     # e.g. 0.15 s per pass; lowers detection.scale when exceeded
+        "min_scale": 0.25,          # lowest detection scale the latency target may choose
+        "adjust_every": 2.0,        # seconds between budget adjustments
+    },
+    "metrics": {
+        "interval": 10.0,           # seconds between file exports
+        "textfile": None,           # e.g. /var/lib/node_exporter/textfile/sentinel.prom
+        "json_path": os.path.join(DATA_DIR, "metrics.json"),
+        "http_port": None,          # e.g. 9464 to serve /metrics and /metrics.json
+        "http_host": "127.0.0.1",
+        "trace_memory": False,      # tracemalloc gauges; costly, for profiling only
+    },
+    "evidence": {
+        "enabled": True,
+        "out_dir": os.path.join(DATA_DIR, "evidence"),
+        "pre_seconds": 3.0,         # ring buffer kept in memory before a trigger
+        "post_seconds": 3.0,        # recorded after the last unknown face
+        "fps": 5.0,                 # frames kept per second
+        "width": 320,               # frames are downscaled to this width
+        "jpeg_quality": 80,
+        "max_mb": 200,              # oldest incidents are deleted beyond this
+        "workers": 2,               # JPEG encoding/writing threads
+    },
+    "events": {
+        "level": "INFO",            # DEBUG | INFO | WARNING | ERROR
+        "format": "text",           # text ("[+] message key=value") | json (one object per line)
+        "path": None,               # also append to this file, e.g. data/events.log
+        "timestamps": False,        # prefix text lines with the time
+        "queue_size": 10000,        # records waiting for the writer thread; overflow is dropped
+    },
+    "screen": {
+        "max_age": 2.0,             # seconds a cached screen grab stays valid
+        "scale": 0.25,              # working resolution for the backdrop blur
+    },
+    "access_log": {
+        "flush_interval": 1.0,      # seconds between batched writes
+        "batch_size": 256,          # write early once this many entries are queued
+        "fsync": True,
+        "max_segment_bytes": 8 * 1024 * 1024,
+        "max_segment_seconds": 24 * 3600,
+    },
+}
+
+
+def _merge(base, override):
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_config(path=CONFIG_PATH):
+    """Return DEFAULTS overlaid with the settings in `path`, if it exists."""
+    cfg = copy.deepcopy(DEFAULTS)
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                _merge(cfg, json.load(f))
+        except Exception as e:
+            print(f"[!] Ignoring invalid config {path}: {e}")
+    return cfg
@@ -6,6 +6,10 @@ from typing import Any, Dict
 from Crypto.Cipher import AES, PKCS1_OAEP
 from Crypto.PublicKey import RSA
 from Crypto.Random import get_random_bytes
+from events import get_logger
+
+log = get_logger("crypto")
+
 
 def generate_rsa_keys(bits: int = 2048, priv_path="data/private.pem", pub_path="data/public.pem"):
     key = RSA.generate(bits)
@@ -15,7 +19,7 @@ def generate_rsa_keys(bits: int = 2048, priv_path="data/private.pem", pub_path="
         f.write(private_key)
     with open(pub_path, "wb") as f:
         f.write(public_key)
-    print(f"[+] RSA keys saved to {priv_path}, {pub_path}")
+    log.info("RSA keys saved", private=priv_path, public=pub_path)
 
 
 def load_rsa_keys(priv_path="data/private.pem", pub_path="data/public.pem"):
@@ -70,3 +74,98 @@ def decrypt_encoding(enc_dict: Dict[str, Any], private_key: RSA.RsaKey) -> np.nd
     bio = io.BytesIO(raw)
     arr = np.load(bio, allow_pickle=False)
     return arr
+
+
+# --- Batch (envelope) encryption ---
+# One random AES-256 data key per gallery is wrapped once with RSA-OAEP; every
+# record is then sealed with AES-GCM under that key, with the user name as
+# associated data so records cannot be swapped between users. Loading a
+# gallery costs a single RSA private-key operation.
+
+DATA_KEY_BYTES = 32
+NONCE_BYTES = 12
+TAG_BYTES = 16
+RECORD_DTYPE = np.dtype("<f4")
+
+
+def wrap_data_key(data_key: bytes, public_key: RSA.RsaKey) -> str:
+    return base64.b64encode(PKCS1_OAEP.new(public_key).encrypt(data_key)).decode()
+
+
+def unwrap_data_key(wrapped: str, private_key: RSA.RsaKey) -> bytes:
+    return PKCS1_OAEP.new(private_key).decrypt(base64.b64decode(wrapped))
+
+
+def seal_bytes(data_key: bytes, label: str, raw: bytes) -> bytes:
+    """AES-GCM seal `raw` as nonce | tag | ciphertext, bound to `label`."""
+    nonce = get_random_bytes(NONCE_BYTES)
+    cipher = AES.new(data_key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(label.encode("utf-8"))
+    ct, tag = cipher.encrypt_and_digest(raw)
+    return nonce + tag + ct
+
+
+def open_bytes(data_key: bytes, label: str, blob: bytes) -> bytes:
+    """Inverse of seal_bytes; raises ValueError if the data was tampered with."""
+    nonce = blob[:NONCE_BYTES]
+    tag = blob[NONCE_BYTES:NONCE_BYTES + TAG_BYTES]
+    ct = blob[NONCE_BYTES + TAG_BYTES:]
+    cipher = AES.new(data_key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(label.encode("utf-8"))
+    return cipher.decrypt_and_verify(ct, tag)
+
+
+def seal_record(data_key: bytes, name: str, arr: np.ndarray) -> bytes:
+    """AES-GCM seal one embedding as nonce | tag | ciphertext (packed float32)."""
+    return seal_bytes(data_key, name, np.ascontiguousarray(arr, dtype=RECORD_DTYPE).tobytes())
+
+
+def open_record(data_key: bytes, name: str, blob: bytes) -> np.ndarray:
+    """Inverse of seal_record; raises ValueError if the record was tampered with."""
+    return np.frombuffer(open_bytes(data_key, name, blob), dtype=RECORD_DTYPE).copy()
+
+
+def encrypt_encodings(encodings: Dict[str, np.ndarray], public_key: RSA.RsaKey,
+                      data_key: bytes = None) -> Dict[str, Any]:
+    """Encrypt a batch of encodings under one RSA-wrapped data key.
+
+    Pass the gallery's existing `data_key` to add records to it; otherwise a
+    fresh key is generated. Returns {"key": wrapped data key, "records":
+    {name: base64 record}}.
+    """
+    if data_key is None:
+        data_key = get_random_bytes(DATA_KEY_BYTES)
+    return {
+        "key": wrap_data_key(data_key, public_key),
+        "records": {
+            name: base64.b64encode(seal_record(data_key, name, arr)).decode()
+            for name, arr in encodings.items()
+        },
+    }
+
+
+def is_legacy_record(record: Any) -> bool:
+    """True for per-record RSA entries written by encrypt_encoding."""
+    return isinstance(record, dict) and "aes_key" in record
+
+
+def decrypt_encodings(batch: Dict[str, Any], private_key: RSA.RsaKey,
+                      data_key: bytes = None) -> Dict[str, np.ndarray]:
+    """Decrypt a batch produced by encrypt_encodings with one RSA unwrap.
+
+    Legacy per-record entries (encrypt_encoding dicts) are accepted in the
+    same batch and decrypted the old way, so galleries can be migrated
+    gradually.
+    """
+    records = batch.get("records", {})
+    if data_key is None and not all(is_legacy_record(r) for r in records.values()):
+        if not batch.get("key"):
+            raise ValueError("Batch has sealed records but no wrapped data key")
+        data_key = unwrap_data_key(batch["key"], private_key)
+    out = {}
+    for name, record in records.items():
+        if is_legacy_record(record):
+            out[name] = decrypt_encoding(record, private_key).astype(RECORD_DTYPE)
+        else:
+            out[name] = open_record(data_key, name, base64.b64decode(record))
+    return out
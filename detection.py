@@ -0,0 +1,120 @@
+# detection.py
+import threading
+import cv2
+import numpy as np
+from config import load_config
+from detectors import make_backend
+from buffers import scratch
+
+
+def _clip(box, shape):
+    top, right, bottom, left = box
+    h, w = shape[:2]
+    return max(0, top), min(w, right), min(h, bottom), max(0, left)
+
+
+def _expand(box, margin, shape):
+    top, right, bottom, left = box
+    dy, dx = int((bottom - top) * margin), int((right - left) * margin)
+    return _clip((top - dy, right + dx, bottom + dy, left - dx), shape)
+
+
+def _merge(regions):
+    """Union overlapping regions so a face between two ROIs is scanned once."""
+    regions = sorted(regions, key=lambda r: r[3])
+    merged = []
+    for r in regions:
+        for i, m in enumerate(merged):
+            if r[0] < m[2] and m[0] < r[2] and r[3] < m[1] and m[3] < r[1]:
+                merged[i] = (min(r[0], m[0]), max(r[1], m[1]), max(r[2], m[2]), min(r[3], m[3]))
+                break
+        else:
+            merged.append(r)
+    return merged
+
+
+class DetectionStrategy:
+    """Face detection that avoids scanning the full-resolution frame.
+
+    Detection runs on a copy downscaled by `scale` and boxes are mapped back
+    to full resolution, where encoding happens. Once faces are known, only
+    the regions around the previous boxes (grown by `roi_margin` of the box
+    size on each side) are searched; a full-frame scan still runs every
+    `full_scan_every` frames, and whenever the ROI search comes back empty,
+    so new or fast-moving faces are picked up.
+    """
+
+    def __init__(self, backend, scale=0.5, roi_margin=0.5, full_scan_every=10):
+        self.backend = backend
+        self.scale = scale
+        self.roi_margin = roi_margin
+        self.full_scan_every = max(1, int(full_scan_every))
+        self._lock = threading.Lock()
+        self._previous = []
+        self._since_full = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+
+    def _locate(self, rgb, offset=(0, 0)):
+        """Detect on a downscaled copy of `rgb`, boxes in full-resolution coords."""
+        oy, ox = offset
+        if self.scale != 1.0:
+            h, w = rgb.shape[:2]
+            size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+            dst = scratch.view("detect", (size[1], size[0]) + rgb.shape[2:])
+            small = cv2.resize(rgb, size, dst=dst, interpolation=cv2.INTER_AREA)
+        elif not rgb.flags.c_contiguous:
+            # an ROI slice at scale 1.0; dlib needs a contiguous buffer
+            small = scratch.view("detect", rgb.shape)
+            np.copyto(small, rgb)
+        else:
+            small = rgb
+        boxes = self.backend.detect(small)
+        inv = 1.0 / self.scale
+        return [
+            (int(t * inv) + oy, int(r * inv) + ox, int(b * inv) + oy, int(l * inv) + ox)
+            for t, r, b, l in boxes
+        ]
+
+    def _full(self, rgb):
+        self.full_scans += 1
+        return [_clip(b, rgb.shape) for b in self._locate(rgb)]
+
+    def _rois(self, rgb, previous):
+        self.roi_scans += 1
+        boxes = []
+        for top, right, bottom, left in _merge([_expand(b, self.roi_margin, rgb.shape) for b in previous]):
+            if bottom - top < 8 or right - left < 8:
+                continue
+            boxes.extend(self._locate(rgb[top:bottom, left:right], (top, left)))
+        return [_clip(b, rgb.shape) for b in boxes]
+
+    def detect(self, rgb, full=False):
+        """Face boxes (top, right, bottom, left) in `rgb`'s own coordinates."""
+        with self._lock:
+            previous = list(self._previous)
+            self._since_full += 1
+            full = full or not previous or self._since_full >= self.full_scan_every
+            if full:
+                self._since_full = 0
+        boxes = [] if full else self._rois(rgb, previous)
+        if not boxes:
+            boxes = self._full(rgb)
+        with self._lock:
+            self._previous = boxes
+        return boxes
+
+    def reset(self):
+        with self._lock:
+            self._previous = []
+            self._since_full = 0
+
+
+def make_detector(cfg=None):
+    """DetectionStrategy built from the `detection` config section."""
+    cfg = (cfg or load_config())["detection"]
+    kind = cfg["backend"]
+    backend = make_backend(kind, **(cfg.get(kind) or {}))
+    return DetectionStrategy(
+        backend, scale=cfg["scale"], roi_margin=cfg["roi_margin"], full_scan_every=cfg["full_scan_every"],
+    )
@@ -0,0 +1,105 @@
+# detectors.py
+"""Interchangeable face detector backends.
+
+Every backend takes an RGB uint8 image and returns face boxes as
+(top, right, bottom, left) tuples, the convention face_recognition uses, so
+boxes can go straight into face_encodings. Pick one with
+`detection.backend` in config; per-backend options live next to it.
+"""
+import os
+import cv2
+import numpy as np
+from buffers import scratch
+
+MODEL_DIR = os.path.join("data", "models")
+
+
+def _xywh_to_box(x, y, w, h):
+    return int(y), int(x + w), int(y + h), int(x)
+
+
+class HogDetector:
+    """dlib HOG + linear SVM (face_recognition's default)."""
+    kind = "hog"
+
+    def __init__(self, upsample=1):
+        import face_recognition
+        self._locate = face_recognition.face_locations
+        self.upsample = upsample
+
+    def detect(self, rgb):
+        return self._locate(rgb, self.upsample, "hog")
+
+
+class CnnDetector(HogDetector):
+    """dlib MMOD CNN; far more robust to pose, far slower on CPU."""
+    kind = "cnn"
+
+    def detect(self, rgb):
+        return self._locate(rgb, self.upsample, "cnn")
+
+
+class HaarDetector:
+    """OpenCV Viola-Jones cascade; the cheapest option, frontal faces only."""
+    kind = "haar"
+
+    def __init__(self, cascade=None, scale_factor=1.1, min_neighbors=5, min_size=24):
+        if not hasattr(cv2, "CascadeClassifier"):
+            # OpenCV 5 moved cascades out of the main package (contrib xobjdetect)
+            raise ImportError("this OpenCV build has no Haar cascade support")
+        cascade = cascade or os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        self.classifier = cv2.CascadeClassifier(cascade)
+        if self.classifier.empty():
+            raise FileNotFoundError(f"Could not load Haar cascade {cascade}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = (min_size, min_size)
+
+    def detect(self, rgb):
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY, dst=scratch.view("haar_gray", rgb.shape[:2]))
+        faces = self.classifier.detectMultiScale(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size
+        )
+        return [_xywh_to_box(*f) for f in faces]
+
+
+class DnnDetector:
+    """OpenCV DNN running the res10 300x300 SSD face model from local files."""
+    kind = "dnn"
+
+    def __init__(self, prototxt=os.path.join(MODEL_DIR, "deploy.prototxt"),
+                 model=os.path.join(MODEL_DIR, "res10_300x300_ssd_iter_140000.caffemodel"),
+                 confidence=0.5, input_size=300):
+        for path in (prototxt, model):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"DNN face model file missing: {path}")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt, model)
+        self.confidence = confidence
+        self.input_size = input_size
+
+    def detect(self, rgb):
+        h, w = rgb.shape[:2]
+        size = (self.input_size, self.input_size)
+        # the model was trained on BGR with these channel means
+        small = cv2.resize(rgb, size, dst=scratch.get("dnn_input", size[::-1] + rgb.shape[2:]))
+        blob = cv2.dnn.blobFromImage(small, 1.0, size, (104.0, 177.0, 123.0), swapRB=True)
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        keep = detections[detections[:, 2] >= self.confidence]
+        boxes = []
+        for x1, y1, x2, y2 in keep[:, 3:7] * np.array([w, h, w, h]):
+            top, right, bottom, left = int(y1), int(x2), int(y2), int(x1)
+            top, left = max(0, top), max(0, left)
+            right, bottom = min(w, right), min(h, bottom)
+            if right > left and bottom > top:
+                boxes.append((top, right, bottom, left))
+        return boxes
+
+
+BACKENDS = {cls.kind: cls for cls in (HogDetector, CnnDetector, HaarDetector, DnnDetector)}
+
+
+def make_backend(kind="hog", **params):
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown detector backend {kind!r}; choose from {sorted(BACKENDS)}")
+    return BACKENDS[kind](**params)
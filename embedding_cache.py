@@ -0,0 +1,102 @@
+# embedding_cache.py
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from buffers import scratch
+
+
+def dhash(image, box, size=8):
+    """Difference hash of a face crop: `size * size` bits as an int, or None."""
+    top, right, bottom, left = box
+    h, w = image.shape[:2]
+    crop = image[max(0, top):min(h, bottom), max(0, left):min(w, right)]
+    if crop.size == 0:
+        return None
+    # shrink first, then grey: the colour conversion only touches (size+1) x size pixels
+    small = cv2.resize(crop, (size + 1, size), dst=scratch.get("dhash", (size, size + 1) + crop.shape[2:]),
+                       interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY, dst=scratch.get("dhash_gray", (size, size + 1)))
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+
+
+class EmbeddingCache:
+    """Recently computed embeddings and matches, found again by how the face looks.
+
+    Each entry is keyed by a difference hash of the face crop plus the box's
+    centre and size. A lookup hits when an entry younger than `ttl` seconds
+    has a hash within `max_hamming` bits, a centre within `max_shift` box
+    widths and a size within `max_scale` (relative), so a face that has not
+    moved or changed between frames skips encoding and matching. At most
+    `size` entries are kept, least recently used evicted first.
+
+    Cached matches are only valid for the gallery they were made against:
+    call `clear()` when it changes.
+    """
+
+    def __init__(self, size=64, ttl=1.0, hash_size=8, max_hamming=6, max_shift=0.15, max_scale=0.15):
+        self.size = size
+        self.ttl = ttl
+        self.hash_size = hash_size
+        self.max_hamming = max_hamming
+        self.max_shift = max_shift
+        self.max_scale = max_scale
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> (hash, cx, cy, width, height, ts, encoding, match)
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def key(self, image, box):
+        top, right, bottom, left = box
+        return (dhash(image, box, self.hash_size), (left + right) / 2.0, (top + bottom) / 2.0,
+                max(1, right - left), max(1, bottom - top))
+
+    def get(self, key, now):
+        """(encoding, match) of the closest fresh entry, or None."""
+        fp, cx, cy, width, height = key
+        if fp is None:
+            return None
+        with self._lock:
+            best, best_bits = None, self.max_hamming + 1
+            for entry_id, entry in list(self._entries.items()):
+                efp, ecx, ecy, ew, eh, ts, _, _ = entry
+                if now - ts > self.ttl:
+                    del self._entries[entry_id]
+                    self.expired += 1
+                    continue
+                if (abs(cx - ecx) > self.max_shift * ew or abs(cy - ecy) > self.max_shift * eh
+                        or abs(width - ew) > self.max_scale * ew or abs(height - eh) > self.max_scale * eh):
+                    continue
+                bits = (fp ^ efp).bit_count()
+                if bits < best_bits:
+                    best, best_bits = entry_id, bits
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best)
+            entry = self._entries[best]
+            return entry[6], entry[7]
+
+    def put(self, key, now, encoding, match):
+        if key[0] is None:
+            return
+        with self._lock:
+            self._entries[self._next_id] = key + (now, encoding, match)
+            self._next_id += 1
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "expired": self.expired, "evicted": self.evicted,
+                "entries": len(self._entries), "hit_rate": round(self.hits / lookups, 3) if lookups else None}
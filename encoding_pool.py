@@ -0,0 +1,124 @@
+# encoding_pool.py
+"""Face encoding spread over a pool of warm worker processes.
+
+face_recognition.face_encodings runs the dlib ResNet once per face on the
+calling thread. For frames with many faces the crops are instead copied into
+one shared-memory block and encoded by worker processes that loaded the dlib
+models once at start-up; only offsets, shapes and the 128-d results cross the
+process boundary.
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import face_recognition
+
+
+def _ping():
+    # face_recognition loads its dlib models on import, so a worker that
+    # answered this is ready to encode
+    return os.getpid()
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before 3.13 attaching also registers the block, but workers share
+        # the parent's resource tracker, so the parent's unlink() settles it
+        return shared_memory.SharedMemory(name=name)
+
+
+def _encode_chunk(shm_name, items, num_jitters):
+    """Encode [(offset, shape, box_in_crop), ...] crops from a shared block."""
+    shm = _attach(shm_name)
+    try:
+        out = []
+        for offset, shape, box in items:
+            crop = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+            out.append(face_recognition.face_encodings(crop, [box], num_jitters)[0])
+            del crop  # release the view before the block is closed
+        return out
+    finally:
+        shm.close()
+
+
+def _crop_box(box, margin, shape):
+    """Crop rectangle around `box` with room for the landmark model."""
+    top, right, bottom, left = box
+    h, w = shape[:2]
+    dy, dx = int((bottom - top) * margin), int((right - left) * margin)
+    return max(0, top - dy), min(w, right + dx), min(h, bottom + dy), max(0, left - dx)
+
+
+class EncodingPool:
+    """Drop-in for face_recognition.face_encodings(rgb, boxes).
+
+    Frames with fewer than `min_faces` faces are encoded in-process, where
+    the round trip would cost more than it saves. `start_method` defaults to
+    fork so workers inherit the already-loaded models; create the pool before
+    starting other threads.
+    """
+
+    def __init__(self, workers=None, min_faces=4, crop_margin=0.5, start_method="fork"):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.min_faces = max(1, int(min_faces))
+        self.crop_margin = crop_margin
+        if start_method not in multiprocessing.get_all_start_methods():
+            start_method = None
+        if os.name == "posix":
+            # started before the workers so they inherit it instead of each
+            # spawning their own, which would unlink blocks it didn't create
+            resource_tracker.ensure_running()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(start_method),
+        )
+        self.pooled_frames = 0
+        self.local_frames = 0
+
+    def warm(self):
+        """Start every worker now rather than on the first crowded frame."""
+        for f in [self._executor.submit(_ping) for _ in range(self.workers)]:
+            f.result()
+        return self
+
+    def encode(self, rgb, boxes, num_jitters=1):
+        boxes = list(boxes)
+        if len(boxes) < self.min_faces:
+            self.local_frames += 1
+            return face_recognition.face_encodings(rgb, boxes, num_jitters)
+        self.pooled_frames += 1
+
+        # pack every crop into one shared block: [crop0 | crop1 | ...]
+        rects = [_crop_box(b, self.crop_margin, rgb.shape) for b in boxes]
+        sizes = [(b - t) * (r - l) * 3 for t, r, b, l in rects]
+        shm = shared_memory.SharedMemory(create=True, size=max(1, sum(sizes)))
+        try:
+            items, offset = [], 0
+            for (top, right, bottom, left), (t, r, b, l), size in zip(boxes, rects, sizes):
+                shape = (b - t, r - l, 3)
+                view = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+                view[:] = rgb[t:b, l:r]
+                del view
+                items.append((offset, shape, (top - t, right - l, bottom - t, left - l)))
+                offset += size
+
+            n = min(self.workers, len(items))
+            chunks = [items[i::n] for i in range(n)]
+            futures = [self._executor.submit(_encode_chunk, shm.name, c, num_jitters) for c in chunks]
+            results = [f.result() for f in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+        # undo the round-robin split so encodings line up with `boxes`
+        encodings = [None] * len(items)
+        for i, chunk in enumerate(results):
+            for j, enc in enumerate(chunk):
+                encodings[i + j * n] = enc
+        return encodings
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
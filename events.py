@@ -0,0 +1,195 @@
+# events.py
+"""Structured, asynchronous event logging.
+
+    log = get_logger("monitor")
+    log.info("Authorized", user=name, distance=0.41)
+    log.info("Grace period active, staying unlocked", every=5.0)
+
+Keyword arguments become structured fields. The calling thread only builds
+a LogRecord and puts it on a bounded queue; a QueueListener thread does all
+formatting (text or JSON lines) and I/O, so a slow terminal or a full pipe
+never stalls the frame loop. `every=` rate-limits a message: repeats within
+that many seconds are dropped and counted, and the next one that gets
+through carries `suppressed=<count>`. If the queue is full, records are
+dropped and counted rather than blocking.
+
+Configured from the `events` config section on first use; call `setup()`
+to override (e.g. `--log-json` on the command line).
+"""
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+ROOT = "sentinel"
+PREFIXES = {logging.DEBUG: "[~]", logging.INFO: "[+]", logging.WARNING: "[!]",
+            logging.ERROR: "[!]", logging.CRITICAL: "[!]"}
+_LOGGING_KWARGS = ("exc_info", "stack_info", "stacklevel", "extra")
+
+_lock = threading.Lock()
+_listener = None
+_handler = None
+_closed = False  # after shutdown(), no new listener at interpreter exit
+
+
+class RateLimitFilter(logging.Filter):
+    """Drops repeats of a record's message within its `every` interval."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._last = {}  # (logger, msg) -> [last emitted, suppressed since]
+
+    def filter(self, record):
+        every = getattr(record, "every", None)
+        if not every:
+            return True
+        key = (record.name, record.msg)
+        now = record.created
+        with self._lock:
+            state = self._last.get(key)
+            if state is not None and now - state[0] < every:
+                state[1] += 1
+                return False
+            if state is not None and state[1]:
+                record.fields = dict(record.fields, suppressed=state[1])
+            self._last[key] = [now, 0]
+        return True
+
+
+class _AsyncHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The stock prepare() formats the message here, on the caller's thread.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for room rather than failing on a full queue."""
+
+    def enqueue_sentinel(self):
+        # the stock put_nowait raises queue.Full, losing the queued records
+        # and leaving the file handler open
+        self.queue.put(self._sentinel)
+
+
+class TextFormatter(logging.Formatter):
+    """`[+] message key=value ...`, in the style of the old print() output."""
+
+    def __init__(self, timestamps=False):
+        super().__init__()
+        self.timestamps = timestamps
+
+    def format(self, record):
+        line = f"{PREFIXES.get(record.levelno, '[?]')} {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if self.timestamps:
+            line = time.strftime("%H:%M:%S", time.localtime(record.created)) + " " + line
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg and the fields."""
+
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(),
+                 "logger": record.name[len(ROOT) + 1:] or ROOT, "msg": record.getMessage()}
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class EventLogger(logging.LoggerAdapter):
+    """Logger whose keyword arguments are structured fields."""
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _LOGGING_KWARGS}
+        extra = kwargs.setdefault("extra", {})
+        extra["every"] = fields.pop("every", None)
+        extra["fields"] = fields
+        return msg, kwargs
+
+    def log(self, level, msg, *args, **kwargs):
+        if _listener is None and not _closed:
+            setup()
+        super().log(level, msg, *args, **kwargs)
+
+
+def get_logger(name):
+    return EventLogger(logging.getLogger(f"{ROOT}.{name}"), {})
+
+
+def setup(level=None, fmt=None, path=None, queue_size=None, timestamps=None):
+    """(Re)configure the sentinel loggers; unset arguments come from config."""
+    global _listener, _handler
+    from config import load_config
+    cfg = load_config()["events"]
+    level = level or cfg["level"]
+    fmt = fmt or cfg["format"]
+    path = path if path is not None else cfg["path"]
+    queue_size = queue_size or cfg["queue_size"]
+    timestamps = cfg["timestamps"] if timestamps is None else timestamps
+
+    with _lock:
+        _stop()
+        formatter = JsonFormatter() if fmt == "json" else TextFormatter(timestamps)
+        outputs = [logging.StreamHandler(sys.stdout)]
+        if path:
+            outputs.append(logging.FileHandler(path))
+        for out in outputs:
+            out.setFormatter(formatter)
+
+        _handler = _AsyncHandler(queue.Queue(queue_size))
+        _handler.addFilter(RateLimitFilter())
+        root = logging.getLogger(ROOT)
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        root.addHandler(_handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        root.propagate = False
+        _listener = _Listener(_handler.queue, *outputs)
+        _listener.start()
+
+
+def dropped():
+    """Records lost to a full queue since setup()."""
+    return _handler.dropped if _handler is not None else 0
+
+
+def _stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # drains what is queued
+        for out in _listener.handlers:
+            out.close()
+        _listener = None
+
+
+def shutdown():
+    global _closed
+    with _lock:
+        _closed = True
+        _stop()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,231 @@
+# evidence.py
+"""Frames around intrusions, kept for audit.
+
+The capture stage hands every frame to `push()`, which keeps at most `fps`
+of them per second and only appends a reference to a deque: no copy, no
+resize, no I/O on the frame path. A background thread downscales each one
+into a fixed ring of `width`-wide buffers covering the last `pre_seconds`,
+after which the full-size frame is released back to the FramePool.
+
+`trigger()` (called on the decision thread when an unknown face is seen
+while locked) names an incident directory and returns it at once, so the
+access-log entry can reference it. The background thread then writes the
+pre-roll from the ring, and every frame for the next `post_seconds`, as
+JPEGs on a small thread pool. Triggers during an incident extend it; the
+extend-or-end decision is taken under one lock on both threads, so a
+trigger never lands in an incident that has just been closed.
+Incident directories are evicted oldest first once `max_mb` is exceeded.
+"""
+import os
+import json
+import time
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from events import get_logger
+
+DATA_DIR = "data"
+EVIDENCE_DIR = os.path.join(DATA_DIR, "evidence")
+
+log = get_logger("evidence")
+
+
+class Incident:
+    __slots__ = ("path", "ts", "until", "fields", "frames")
+
+    def __init__(self, path, ts, until, fields):
+        self.path = path
+        self.ts = ts
+        self.until = until  # pushed forward on re-triggers (under EvidenceRecorder._trigger_lock)
+        self.fields = fields
+        self.frames = 0
+
+
+class EvidenceRecorder:
+    def __init__(self, out_dir=EVIDENCE_DIR, pre_seconds=3.0, post_seconds=3.0, fps=5.0, width=320,
+                 jpeg_quality=80, max_mb=200, workers=2):
+        self.out_dir = out_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.interval = 1.0 / fps
+        self.width = width
+        self.jpeg_quality = int(jpeg_quality)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.workers = workers
+        self._inbox = deque(maxlen=max(2, int(fps)))  # frames; oldest dropped if we fall behind
+        self._triggers = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._last_push = 0.0
+        self._trigger_lock = threading.Lock()
+        self._active = None  # incident a trigger would extend; None once it has ended
+
+        # background thread only
+        slots = max(1, int(round(pre_seconds * fps)) + 1)
+        self._ring = [None] * slots
+        self._ring_ts = [0.0] * slots
+        self._head = 0
+        self._incident = None
+
+        # writers
+        self._lock = threading.Lock()
+        self._sizes = {}  # incident dir -> bytes, oldest first
+        self.bytes = 0
+        self.incidents = 0
+        self.frames_written = 0
+        self.evicted = 0
+        self._thread = None
+        self._pool = None
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        for name in sorted(os.listdir(self.out_dir)):
+            path = os.path.join(self.out_dir, name)
+            if os.path.isdir(path):
+                self._sizes[path] = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+        self.bytes = sum(self._sizes.values())
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="evidence-write")
+        self._thread = threading.Thread(target=self._run, name="evidence", daemon=True)
+        self._thread.start()
+        return self
+
+    # --- capture thread -------------------------------------------------
+    def push(self, frame):
+        if frame.timestamp - self._last_push < self.interval:
+            return
+        self._last_push = frame.timestamp
+        self._inbox.append(frame)
+        self._wake.set()
+
+    # --- decision thread ------------------------------------------------
+    def trigger(self, now=None, **fields):
+        """Start (or extend) an incident; its directory, or None if extended."""
+        now = time.time() if now is None else now
+        with self._trigger_lock:
+            if self._active is not None:
+                self._active.until = max(self._active.until, now + self.post_seconds)
+                return None
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+            incident = self._active = Incident(os.path.join(self.out_dir, stamp), now,
+                                               now + self.post_seconds, fields)
+        self._triggers.append(incident)
+        self._wake.set()
+        return incident.path
+
+    # --- background thread ----------------------------------------------
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(0.2)
+            self._wake.clear()
+            while self._inbox:
+                self._ingest(self._inbox.popleft())
+            while self._triggers:
+                self._open(self._triggers.popleft())
+            if self._incident is not None and self._expired(self._incident, time.time()):
+                self._close_incident()
+        self._close_incident()
+
+    def _ingest(self, frame):
+        image = frame.image
+        h, w = image.shape[:2]
+        size = (self.width, max(1, int(h * self.width / w)))
+        slot = self._ring[self._head]
+        if slot is None or slot.shape[:2] != size[::-1] or slot.shape[2:] != image.shape[2:]:
+            slot = None
+        slot = cv2.resize(image, size, dst=slot, interpolation=cv2.INTER_AREA)
+        self._ring[self._head] = slot
+        self._ring_ts[self._head] = frame.timestamp
+        self._head = (self._head + 1) % len(self._ring)
+        incident = self._incident
+        if incident is not None:
+            if self._expired(incident, frame.timestamp):
+                self._close_incident()
+            else:
+                self._write(incident, frame.timestamp, slot)
+
+    def _expired(self, incident, now):
+        """End `incident` if its post-roll is over; later triggers start a new one."""
+        with self._trigger_lock:
+            if now <= incident.until:
+                return False
+            if self._active is incident:
+                self._active = None
+            return True
+
+    def _open(self, incident):
+        self._close_incident()
+        os.makedirs(incident.path, exist_ok=True)
+        with self._lock:
+            self._sizes[incident.path] = 0
+            self.incidents += 1
+        self._incident = incident
+        # ring from oldest to newest; includes frames ingested after the trigger
+        n = len(self._ring)
+        for i in range(n):
+            j = (self._head + i) % n
+            if self._ring[j] is not None and self._ring_ts[j] >= incident.ts - self.pre_seconds:
+                self._write(incident, self._ring_ts[j], self._ring[j])
+
+    def _close_incident(self):
+        incident, self._incident = self._incident, None
+        if incident is None:
+            return
+        meta = dict(incident.fields, ts=round(incident.ts, 3), frames=incident.frames,
+                    pre_seconds=self.pre_seconds, post_seconds=self.post_seconds)
+        self._pool.submit(self._save_meta, incident.path, meta)
+
+    def _write(self, incident, ts, image):
+        incident.frames += 1
+        path = os.path.join(incident.path, f"{int(ts * 1000):015d}.jpg")
+        self._pool.submit(self._save_jpeg, path, image.copy())  # the ring slot is reused
+
+    # --- writer threads -------------------------------------------------
+    def _save_jpeg(self, path, image):
+        ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if ok:
+            self._save(path, data.tobytes())
+            with self._lock:
+                self.frames_written += 1
+
+    def _save_meta(self, directory, meta):
+        self._save(os.path.join(directory, "incident.json"), json.dumps(meta, default=str).encode())
+
+    def _save(self, path, data):
+        directory = os.path.dirname(path)
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+        except OSError as e:  # e.g. the incident was evicted meanwhile
+            log.warning("Could not save evidence", path=path, error=e, every=10.0)
+            return
+        with self._lock:
+            if directory in self._sizes:
+                self._sizes[directory] += len(data)
+                self.bytes += len(data)
+            self._evict(keep=directory)
+
+    def _evict(self, keep):
+        """Drop whole incidents, oldest first, until under max_bytes (lock held)."""
+        while self.bytes > self.max_bytes and self._sizes:
+            oldest = next(iter(self._sizes))
+            if oldest == keep:
+                break
+            self.bytes -= self._sizes.pop(oldest)
+            shutil.rmtree(oldest, ignore_errors=True)
+            self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            return {"incidents": self.incidents, "frames_written": self.frames_written,
+                    "bytes": self.bytes, "evicted": self.evicted}
+
+    def close(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._pool.shutdown(wait=True)
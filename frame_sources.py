@@ -0,0 +1,180 @@
+# frame_sources.py
+"""Where frames come from: camera, video file, image directory or synthetic.
+
+Every source has the subset of the cv2.VideoCapture interface the pipeline
+uses (`isOpened()`, `read(image=None) -> (ok, image)`, `release()`), so the
+capture stage does not care which one it reads. `image` is a preallocated
+buffer to decode into; sources that cannot use it return a new array. Recorded sources can be paced at
+their own frame rate (`realtime=True`, as a camera would deliver them) or
+read as fast as they decode, and can loop for soak tests. `ended` is set
+once a finite source has run out, so a failed read can be told apart from
+the expected end of a recording; a camera never ends.
+"""
+import os
+import time
+import cv2
+import numpy as np
+from events import get_logger
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+log = get_logger("frame_sources")
+
+
+class _Pacer:
+    """Sleeps so that successive frames are at least 1/fps apart."""
+
+    def __init__(self, fps):
+        self.interval = 1.0 / fps if fps else 0.0
+        self.due = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if self.due is not None and now < self.due:
+            time.sleep(self.due - now)
+            now = self.due
+        self.due = now + self.interval
+
+
+class CameraSource:
+    """A live camera with a tiny driver-side buffer so frames stay fresh."""
+    ended = False
+
+    def __init__(self, index=0, buffer_size=1):
+        self.cap = cv2.VideoCapture(index)
+        if self.cap.isOpened():
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        return self.cap.read(image)
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource:
+    """Recorded footage, decoded with OpenCV."""
+
+    def __init__(self, path, realtime=False, loop=False):
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.pacer = _Pacer(self.fps if realtime else None)
+        self.ended = False
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        self.pacer.wait()
+        ok, out = self.cap.read(image)
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, out = self.cap.read(image)
+        self.ended = not ok
+        return ok, out
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource:
+    """Still images in name order, delivered at `fps` when realtime."""
+
+    def __init__(self, path, realtime=False, loop=False, fps=10.0):
+        self.paths = sorted(os.path.join(path, n) for n in os.listdir(path)
+                            if n.lower().endswith(IMAGE_EXTS))
+        self.loop = loop
+        self.fps = fps
+        self.pacer = _Pacer(fps if realtime else None)
+        self.pos = 0
+        self.ended = False
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self, image=None):
+        self.pacer.wait()  # imread always allocates; `image` is ignored
+        while True:
+            if self.pos >= len(self.paths):
+                if not self.loop or not self.paths:
+                    self.ended = True
+                    return False, None
+                self.pos = 0
+            path = self.paths[self.pos]
+            self.pos += 1
+            image = cv2.imread(path)
+            if image is not None:
+                return True, image
+            log.warning("Skipping unreadable image", path=path)
+
+    def release(self):
+        self.paths = []
+
+
+class SyntheticSource:
+    """Generated frames for load tests: a bright blob drifting over noise.
+
+    `frames=None` runs until released. The content is deterministic for a
+    given seed, so runs are comparable.
+    """
+
+    def __init__(self, width=640, height=480, frames=None, realtime=False, fps=30.0, seed=0):
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(0, 64, size=(height, width, 3), dtype=np.uint8)
+        self.frames = frames
+        self.fps = fps
+        self.pacer = _Pacer(fps if realtime else None)
+        self.count = 0
+        self.opened = True
+        self.ended = False
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self, image=None):
+        if not self.opened or (self.frames is not None and self.count >= self.frames):
+            self.ended = self.opened
+            return False, None
+        self.pacer.wait()
+        h, w = self.background.shape[:2]
+        t = self.count / self.fps
+        centre = (int(w / 2 + w / 4 * np.sin(t)), int(h / 2 + h / 6 * np.cos(t * 0.7)))
+        if image is None or image.shape != self.background.shape:
+            image = self.background.copy()
+        else:
+            np.copyto(image, self.background)
+        cv2.ellipse(image, centre, (w // 12, h // 7), 0, 0, 360, (190, 200, 220), -1)
+        self.count += 1
+        return True, image
+
+    def release(self):
+        self.opened = False
+
+
+def open_source(uri=0, realtime=True, loop=False, buffer_size=1, frames=None):
+    """Open a source from a config/CLI string.
+
+    0, "0" or "camera:0"     live camera by index
+    "synthetic[:WxH]"        generated frames (`frames` of them; None = endless)
+    a directory              still images in name order
+    anything else            a video file (or a URL OpenCV can open)
+    """
+    uri = str(uri)
+    if uri.isdigit():
+        return CameraSource(int(uri), buffer_size)
+    if uri.startswith("camera:"):
+        return CameraSource(int(uri.split(":", 1)[1] or 0), buffer_size)
+    if uri == "synthetic" or uri.startswith("synthetic:"):
+        size = uri.split(":", 1)[1] if ":" in uri else "640x480"
+        width, height = (int(v) for v in size.lower().split("x"))
+        return SyntheticSource(width, height, frames=frames, realtime=realtime)
+    if os.path.isdir(uri):
+        return ImageDirSource(uri, realtime=realtime, loop=loop)
+    return VideoFileSource(uri, realtime=realtime, loop=loop)
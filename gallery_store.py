@@ -0,0 +1,305 @@
+# gallery_store.py
+"""Binary face gallery.
+
+Two files live side by side:
+
+  faces.gal      header (magic, version, dim, generation, RSA-wrapped data key)
+                 followed by fixed-size slots, each holding one AES-GCM sealed
+                 float32 embedding: state | nonce | tag | ciphertext
+  faces.gal.idx  append-only JSON lines mapping names (and metadata) to slots:
+                 {"op": "gen", ...} first, then "put" / "del" entries
+
+Enrolling appends one slot and one index line; deleting flips the slot's
+state byte and appends a tombstone, and re-enrolling a name simply appends a
+newer "put" that supersedes the old slot. Dead slots are reclaimed by compaction,
+which copies live ciphertext verbatim (records are bound to the user name,
+not to the slot) into fresh files and bumps the generation. Reads memory-map
+the slot block.
+"""
+import os
+import sys
+import json
+import struct
+import threading
+import numpy as np
+
+from crypto_utils import (DATA_KEY_BYTES, NONCE_BYTES, TAG_BYTES, RECORD_DTYPE,
+                          wrap_data_key, unwrap_data_key, seal_record, open_record,
+                          decrypt_encodings)
+from Crypto.Random import get_random_bytes
+from events import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+log = get_logger("gallery")
+
+DATA_DIR = "data"
+GALLERY_PATH = os.path.join(DATA_DIR, "faces.gal")
+LEGACY_DB_PATH = os.path.join(DATA_DIR, "faces.json")
+
+MAGIC = b"SNTLGAL\x01"
+VERSION = 1
+HEADER_SIZE = 1024
+_HEADER = struct.Struct("<8sHHIQH")  # magic, version, dim, slot size, generation, key length
+STATE_DEAD, STATE_LIVE = 0, 1
+
+
+def slot_dtype(dim):
+    return np.dtype([
+        ("state", "u1"), ("pad", "u1", 3),
+        ("nonce", "u1", NONCE_BYTES), ("tag", "u1", TAG_BYTES),
+        ("ct", "u1", dim * RECORD_DTYPE.itemsize),
+    ])
+
+
+class GalleryStore:
+    def __init__(self, path=GALLERY_PATH):
+        self.path = path
+        self.idx_path = path + ".idx"
+        self.lock_path = path + ".lock"
+        self._lock = threading.RLock()
+        self._data_key = None
+        self._compacting = None
+
+    # --- header / index -------------------------------------------------
+    def exists(self):
+        return os.path.exists(self.path) and os.path.exists(self.idx_path)
+
+    def read_header(self):
+        with open(self.path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        magic, version, dim, slot_size, generation, key_len = _HEADER.unpack_from(raw)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a gallery file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported gallery version {version}")
+        wrapped = raw[_HEADER.size:_HEADER.size + key_len].decode()
+        return {"dim": dim, "slot_size": slot_size, "generation": generation, "key": wrapped}
+
+    def _write_header(self, f, dim, generation, wrapped):
+        key = wrapped.encode()
+        head = _HEADER.pack(MAGIC, VERSION, dim, slot_dtype(dim).itemsize, generation, len(key)) + key
+        f.write(head.ljust(HEADER_SIZE, b"\0"))
+
+    def read_index(self):
+        """Replay the index log -> (generation, {name: (slot, meta)}, dead slots)."""
+        entries, dead, generation = {}, 0, None
+        with open(self.idx_path, "r") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # torn write from a crashed writer
+                rec = json.loads(line)
+                op = rec["op"]
+                if op == "gen":
+                    generation = rec["generation"]
+                elif op == "put":
+                    if rec["name"] in entries:
+                        dead += 1
+                    entries[rec["name"]] = (rec["slot"], rec.get("meta", {}))
+                elif op == "del" and entries.pop(rec["name"], None) is not None:
+                    dead += 1
+        return generation, entries, dead
+
+    def names(self):
+        return list(self.read_index()[1]) if self.exists() else []
+
+    def _open_lock(self):
+        f = open(self.lock_path, "a")
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    # --- keys -----------------------------------------------------------
+    def create(self, public_key, dim=128, data_key=None):
+        """Start an empty gallery under a new (or given) data key."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data_key = data_key or get_random_bytes(DATA_KEY_BYTES)
+        with self._lock:
+            with open(self.path, "wb") as f:
+                self._write_header(f, dim, 1, wrap_data_key(data_key, public_key))
+            with open(self.idx_path, "w") as f:
+                f.write(json.dumps({"op": "gen", "generation": 1}) + "\n")
+        self._data_key = data_key
+        return data_key
+
+    def unlock(self, private_key):
+        """Unwrap (once) and cache the gallery's data key."""
+        if self._data_key is None:
+            self._data_key = unwrap_data_key(self.read_header()["key"], private_key)
+        return self._data_key
+
+    # --- writes ---------------------------------------------------------
+    def put(self, name, encoding, private_key, meta=None):
+        """Append one sealed embedding without reading the rest of the gallery."""
+        data_key = self.unlock(private_key)
+        header = self.read_header()
+        blob = seal_record(data_key, name, np.asarray(encoding).reshape(header["dim"]))
+        record = np.zeros(1, dtype=slot_dtype(header["dim"]))
+        record["state"] = STATE_LIVE
+        record["nonce"] = np.frombuffer(blob[:NONCE_BYTES], np.uint8)
+        record["tag"] = np.frombuffer(blob[NONCE_BYTES:NONCE_BYTES + TAG_BYTES], np.uint8)
+        record["ct"] = np.frombuffer(blob[NONCE_BYTES + TAG_BYTES:], np.uint8)
+        with self._lock, self._open_lock():
+            with open(self.path, "r+b") as f:
+                f.seek(0, os.SEEK_END)
+                # slot number comes from the file size; a torn trailing slot
+                # from a crashed writer is overwritten
+                slot = (f.tell() - HEADER_SIZE) // header["slot_size"]
+                f.truncate(HEADER_SIZE + slot * header["slot_size"])
+                f.seek(HEADER_SIZE + slot * header["slot_size"])
+                f.write(record.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            # A later "put" for the same name supersedes the earlier slot,
+            # which then counts as dead until compaction.
+            with open(self.idx_path, "a") as f:
+                f.write(json.dumps({"op": "put", "name": name, "slot": int(slot), "meta": meta or {}}) + "\n")
+        return slot
+
+    def _kill_slot(self, f, slot, slot_size):
+        f.seek(HEADER_SIZE + slot * slot_size)
+        f.write(bytes([STATE_DEAD]))
+
+    def delete(self, name):
+        """Tombstone `name`; the slot is reclaimed by the next compaction."""
+        with self._lock, self._open_lock():
+            _, entries, _ = self.read_index()
+            if name not in entries:
+                return False
+            header = self.read_header()
+            with open(self.path, "r+b") as f:
+                self._kill_slot(f, entries[name][0], header["slot_size"])
+            with open(self.idx_path, "a") as f:
+                f.write(json.dumps({"op": "del", "name": name}) + "\n")
+        return True
+
+    def compact(self):
+        """Rewrite both files with only live slots and bump the generation."""
+        with self._lock, self._open_lock():
+            header = self.read_header()
+            _, entries, dead = self.read_index()
+            if dead == 0:
+                return False
+            slots = self._map_slots(header)
+            generation = header["generation"] + 1
+            tmp, idx_tmp = self.path + ".tmp", self.idx_path + ".tmp"
+            with open(tmp, "wb") as f, open(idx_tmp, "w") as fi:
+                self._write_header(f, header["dim"], generation, header["key"])
+                fi.write(json.dumps({"op": "gen", "generation": generation}) + "\n")
+                for new_slot, (name, (slot, meta)) in enumerate(entries.items()):
+                    f.write(slots[slot].tobytes())
+                    fi.write(json.dumps({"op": "put", "name": name, "slot": new_slot, "meta": meta}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            del slots  # release the mapping before replacing the file
+            # Readers check that the index generation matches the header's,
+            # so the short window between these renames is detected and retried.
+            os.replace(tmp, self.path)
+            os.replace(idx_tmp, self.idx_path)
+        log.info("Compacted gallery", dropped=dead, generation=generation)
+        return True
+
+    def maybe_compact(self, min_dead=32, ratio=0.25, background=True):
+        """Compact when dead slots exceed both `min_dead` and `ratio` of the file."""
+        if not self.exists():
+            return False
+        _, entries, dead = self.read_index()
+        if dead < min_dead or dead < ratio * (dead + len(entries)):
+            return False
+        if not background:
+            return self.compact()
+        if self._compacting is not None and self._compacting.is_alive():
+            return False
+        self._compacting = threading.Thread(target=self.compact, name="gallery-compact", daemon=True)
+        self._compacting.start()
+        return True
+
+    # --- reads ----------------------------------------------------------
+    def _map_slots(self, header):
+        size = os.path.getsize(self.path)
+        count = (size - HEADER_SIZE) // header["slot_size"]
+        if count <= 0:
+            return np.zeros(0, dtype=slot_dtype(header["dim"]))
+        return np.memmap(self.path, dtype=slot_dtype(header["dim"]), mode="r",
+                         offset=HEADER_SIZE, shape=(count,))
+
+    def snapshot(self, retries=5):
+        """Consistent (header, entries, mapped slots) view of the store."""
+        for _ in range(retries):
+            header = self.read_header()
+            generation, entries, _ = self.read_index()
+            slots = self._map_slots(header)
+            # a compaction replaces both files; re-check once the slots are
+            # mapped so they come from the file the index describes
+            if generation == header["generation"] == self.read_header()["generation"]:
+                return header, entries, slots
+        raise RuntimeError("Gallery changed repeatedly while loading; try again")
+
+    def decrypt(self, private_key, names=None, snapshot=None):
+        """Decrypt embeddings for `names` (default: all live users)."""
+        data_key = self.unlock(private_key)
+        header, entries, slots = snapshot or self.snapshot()
+        out = {}
+        for name in (entries if names is None else names):
+            if name not in entries:
+                continue
+            rec = slots[entries[name][0]]
+            if rec["state"] != STATE_LIVE:
+                continue
+            blob = rec["nonce"].tobytes() + rec["tag"].tobytes() + rec["ct"].tobytes()
+            out[name] = open_record(data_key, name, blob)
+        return out
+
+    def load(self, private_key):
+        return self.decrypt(private_key)
+
+    def stats(self):
+        header = self.read_header()
+        _, entries, dead = self.read_index()
+        return {"users": len(entries), "dead": dead, "generation": header["generation"],
+                "bytes": os.path.getsize(self.path) + os.path.getsize(self.idx_path)}
+
+
+def convert_json(json_path, store, private_key, public_key):
+    """One-shot migration of faces.json (legacy or batch records) into `store`.
+
+    The JSON file is renamed to *.migrated afterwards so it is not converted twice.
+    """
+    with open(json_path, "r") as f:
+        db = json.load(f)
+    users = db.get("users", {})
+    plain = decrypt_encodings({"key": db.get("key"),
+                               "records": {u: info["encoding"] for u, info in users.items()}},
+                              private_key)
+    dim = len(next(iter(plain.values()))) if plain else 128
+    store.create(public_key, dim=dim)
+    for name, enc in plain.items():
+        store.put(name, enc, private_key, meta=users[name].get("meta", {}))
+    os.replace(json_path, json_path + ".migrated")
+    log.info("Converted gallery", users=len(plain), source=json_path, path=store.path)
+    return len(plain)
+
+
+def open_gallery(private_key, public_key, path=GALLERY_PATH, legacy_path=LEGACY_DB_PATH):
+    """Open the binary gallery, converting (or creating) it on first use."""
+    store = GalleryStore(path)
+    if not store.exists():
+        if os.path.exists(legacy_path):
+            convert_json(legacy_path, store, private_key, public_key)
+        else:
+            store.create(public_key)
+    return store
+
+
+if __name__ == "__main__":
+    from crypto_utils import load_rsa_keys
+    src = sys.argv[1] if len(sys.argv) > 1 else LEGACY_DB_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else GALLERY_PATH
+    priv, pub = load_rsa_keys(os.path.join(DATA_DIR, "private.pem"), os.path.join(DATA_DIR, "public.pem"))
+    target = GalleryStore(dst)
+    if target.exists():
+        raise SystemExit(f"{dst} already exists; refusing to overwrite")
+    convert_json(src, target, priv, pub)
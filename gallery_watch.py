@@ -0,0 +1,91 @@
+# gallery_watch.py
+import os
+import threading
+from events import get_logger
+
+log = get_logger("gallery_watch")
+
+
+class GalleryWatcher:
+    """Notices gallery changes made by other processes and yields only the delta.
+
+    The store's index file is append-only and rewritten on compaction, so
+    its (inode, size, mtime) changes whenever a user is added, replaced or
+    deleted. On a change the index is replayed and compared with the
+    name -> slot map seen last time; only new or moved slots are decrypted.
+    Compaction bumps the generation and moves every slot, in which case all
+    live records are decrypted and GalleryMatcher.apply skips the unchanged
+    ones.
+    """
+
+    def __init__(self, store, private_key, on_change, interval=1.0):
+        self.store = store
+        self.private_key = private_key
+        self.on_change = on_change
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stat = None
+        self._generation = None
+        self._slots = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat_key(self):
+        try:
+            st = os.stat(self.store.idx_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def load(self):
+        """Decrypt the whole gallery and make it the baseline for later polls."""
+        with self._lock:
+            stat = self._stat_key()
+            snapshot = self.store.snapshot()
+            header, entries, _ = snapshot
+            gallery = self.store.decrypt(self.private_key, snapshot=snapshot)
+            self._stat, self._generation = stat, header["generation"]
+            self._slots = {name: slot for name, (slot, _) in entries.items()}
+        return gallery
+
+    def poll(self):
+        """(added {name: encoding}, removed [names]) since last time, or None."""
+        with self._lock:
+            # stat before reading, so a write racing this poll shows up next time
+            stat = self._stat_key()
+            if stat is None or stat == self._stat:
+                return None
+            snapshot = self.store.snapshot()
+            header, entries, _ = snapshot
+            slots = {name: slot for name, (slot, _) in entries.items()}
+            if header["generation"] == self._generation:
+                changed = [n for n, s in slots.items() if self._slots.get(n) != s]
+                added = self.store.decrypt(self.private_key, changed, snapshot)
+            else:
+                added = self.store.decrypt(self.private_key, snapshot=snapshot)
+            removed = [n for n in self._slots if n not in slots]
+            self._stat, self._generation, self._slots = stat, header["generation"], slots
+        if not added and not removed:
+            return None
+        return added, removed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                delta = self.poll()
+            except Exception as e:
+                log.error("Gallery watch failed", error=e, every=30.0)
+                continue
+            if delta is not None:
+                self.on_change(*delta)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="gallery-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1.0)
+            self._thread = None
@@ -0,0 +1,146 @@
+# governor.py
+"""Recognition rate control for the monitor.
+
+The rate follows what the monitor is doing:
+
+  idle    locked and nobody in view: slow polling (`idle_fps`)
+  burst   a new face, an unknown face, motion while locked, or the owner
+          missing during the grace period: `burst_fps` for `burst_seconds`
+  verify  unlocked with the owner in view: moderate re-checks (`verify_fps`)
+
+On top of that, two optional budgets are enforced from measured
+recognition times. `target_latency` (seconds per full recognition pass)
+lowers the detection scale, down to `min_scale`, while passes are too slow
+and raises it back once there is headroom. `cpu_budget` (busy fraction of
+one core) caps the rate at budget / cost-per-frame.
+"""
+import threading
+import time
+
+STATES = ("idle", "burst", "verify")
+_SMOOTHING = 0.2     # EWMA weight of the newest sample
+_SCALE_STEP = 0.85   # multiplicative detection scale change per adjustment
+
+
+class Governor:
+    def __init__(self, idle_fps=2.0, burst_fps=30.0, verify_fps=5.0, burst_seconds=3.0,
+                 cpu_budget=None, target_latency=None, min_scale=0.25, adjust_every=2.0):
+        self.fps = {"idle": idle_fps, "burst": burst_fps, "verify": verify_fps}
+        self.burst_seconds = burst_seconds
+        self.cpu_budget = cpu_budget
+        self.target_latency = target_latency
+        self.min_scale = min_scale
+        self.adjust_every = adjust_every
+        self.detector = None
+        self.motion_gate = None
+        self.max_scale = None
+        self._cond = threading.Condition()
+        self._last_slot = 0.0
+        self._burst_until = 0.0
+        self._faces = 0
+        self._seen_motion = 0.0
+        self._adjusted_at = time.perf_counter()
+        self.state = "burst"  # start attentive; settles within burst_seconds
+        self.cost = None      # EWMA seconds per frame, reused ones included
+        self.latency = None   # EWMA seconds per full recognition pass
+        self.cpu_cap = None   # fps allowed by cpu_budget
+
+    def attach(self, recognizer):
+        """Take the detector (for scale changes) and motion gate from a Recognizer."""
+        self.detector = recognizer.detector
+        self.motion_gate = recognizer.motion_gate
+        self.max_scale = self.detector.scale
+        self._burst_until = time.time() + self.burst_seconds
+        return self
+
+    @property
+    def rate(self):
+        fps = self.fps[self.state]
+        if self.cpu_cap is not None:
+            fps = min(fps, self.cpu_cap)
+        return max(fps, 0.1)
+
+    # --- recognition workers ----------------------------------------------
+    def throttle(self, stop_event):
+        """Block until the next recognition slot at the current rate.
+
+        Rate changes wake waiting workers, so a burst starts immediately
+        rather than after the remainder of an idle interval.
+        """
+        with self._cond:
+            while not stop_event.is_set():
+                now = time.perf_counter()
+                due = self._last_slot + 1.0 / self.rate
+                if now >= due:
+                    self._last_slot = now
+                    return
+                self._cond.wait(min(due - now, 0.1))
+
+    def wrap(self, process):
+        """`process` with its duration fed to observe()."""
+        def governed(frame):
+            start = time.perf_counter()
+            result = process(frame)
+            self.observe(time.perf_counter() - start, result is not None and result.reused)
+            return result
+        return governed
+
+    def observe(self, seconds, reused=False):
+        with self._cond:
+            self.cost = seconds if self.cost is None else self.cost + _SMOOTHING * (seconds - self.cost)
+            if not reused:
+                self.latency = (seconds if self.latency is None
+                                else self.latency + _SMOOTHING * (seconds - self.latency))
+            now = time.perf_counter()
+            if now - self._adjusted_at >= self.adjust_every:
+                self._adjusted_at = now
+                self._adjust()
+
+    def _adjust(self):
+        if self.cpu_budget and self.cost:
+            self.cpu_cap = self.cpu_budget / self.cost
+        if not self.target_latency or self.latency is None or self.detector is None:
+            return
+        scale = self.detector.scale
+        if self.latency > self.target_latency and scale > self.min_scale:
+            scale = max(self.min_scale, scale * _SCALE_STEP)
+        elif self.latency < 0.6 * self.target_latency and scale < self.max_scale:
+            scale = min(self.max_scale, scale / _SCALE_STEP)
+        else:
+            return
+        self.detector.scale = round(scale, 3)
+        self.latency = None  # re-measure at the new scale
+
+    # --- decision stage ----------------------------------------------------
+    def update(self, result, authorized):
+        """Pick the state from the latest decision (main thread)."""
+        now = time.time()
+        faces = len(result.boxes)
+        moved = False
+        if self.motion_gate is not None:
+            moved = self.motion_gate.last_motion > self._seen_motion
+            self._seen_motion = self.motion_gate.last_motion
+        if (faces > self._faces or (moved and not authorized)
+                or (not result.matched and (faces or authorized))):
+            self._burst_until = now + self.burst_seconds
+        self._faces = faces
+        if now < self._burst_until:
+            state = "burst"
+        elif authorized:
+            state = "verify"
+        else:
+            state = "idle"
+        if state != self.state:
+            with self._cond:
+                self.state = state
+                self._cond.notify_all()
+        return state
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "rate": round(self.rate, 2),
+            "scale": self.detector.scale if self.detector is not None else None,
+            "latency_ms": None if self.latency is None else round(self.latency * 1000.0, 2),
+            "cpu_cap": None if self.cpu_cap is None else round(self.cpu_cap, 2),
+        }
@@ -0,0 +1,106 @@
+# local_ipc.py
+"""Tiny JSON-lines request/response channel between local processes.
+
+Listens on a Unix socket where the platform has them and on a loopback TCP
+port otherwise. Each request is one JSON object per line and gets exactly one
+JSON object back.
+"""
+import os
+import json
+import socket
+import threading
+
+HAS_UNIX = hasattr(socket, "AF_UNIX")
+
+
+class LineServer:
+    """Serve `handler(request dict) -> response dict` on a background thread."""
+
+    def __init__(self, path, port, handler, name="ipc"):
+        self.path = path
+        self.port = port
+        self.handler = handler
+        self.name = name
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        if HAS_UNIX:
+            if os.path.exists(self.path):
+                if ping(self.path, self.port):
+                    raise RuntimeError(f"{self.name} server already running at {self.path}")
+                os.unlink(self.path)  # stale socket from a crashed process
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(self.path)
+            os.chmod(self.path, 0o600)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", self.port))
+        sock.listen(8)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._serve, name=f"{self.name}-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def _serve(self):
+        while self._sock is not None:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn, conn.makefile("rw") as f:
+            for line in f:
+                try:
+                    reply = self.handler(json.loads(line))
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+                f.write(json.dumps(reply if reply is not None else {"ok": True}) + "\n")
+                f.flush()
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+        if HAS_UNIX and os.path.exists(self.path):
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def _connect(path, port, timeout):
+    if HAS_UNIX:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = path
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ("127.0.0.1", port)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(path, port, message, timeout=1.0):
+    """Send one request and return the decoded reply (raises OSError if down)."""
+    with _connect(path, port, timeout) as sock, sock.makefile("rw") as f:
+        f.write(json.dumps(message) + "\n")
+        f.flush()
+        line = f.readline()
+    if not line:
+        raise ConnectionError("server closed the connection")
+    return json.loads(line)
+
+
+def ping(path, port, timeout=0.5):
+    try:
+        return request(path, port, {"cmd": "ping"}, timeout).get("ok", False)
+    except (OSError, ValueError):
+        return False
@@ -0,0 +1,175 @@
+# log_query.py
+"""Read side of the segmented access log (see access_log.py).
+
+Each segment gets a sparse index: first/last timestamp, entry count, the set
+of users seen and a (ts, byte offset) mark every MARK_EVERY entries. Closed
+segments cache it in a <segment>.idx sidecar; the active segment's index is
+extended incrementally from where it was last read.
+
+Newest-first pages are read backwards from a byte cursor and need no index at
+all, so the first page costs the same regardless of how much history exists.
+"""
+import os
+import json
+import bisect
+
+from access_log import LOG_DIR, list_segments
+
+MARK_EVERY = 256
+CHUNK = 64 * 1024
+
+
+def _complete_end(f, end):
+    """Largest offset <= end that follows a newline (skips a torn last line)."""
+    pos = end
+    while pos > 0:
+        step = min(CHUNK, pos)
+        f.seek(pos - step)
+        i = f.read(step).rfind(b"\n")
+        if i >= 0:
+            return pos - step + i + 1
+        pos -= step
+    return 0
+
+
+def _lines_backwards(f, end):
+    """Yield (offset, raw line) for complete lines before `end`, newest first."""
+    lo, buf, stop = _complete_end(f, end), b"", 0
+    while True:
+        i = buf.rfind(b"\n", 0, stop)
+        if i >= 0:
+            if stop - i > 1:
+                yield lo + i + 1, buf[i + 1:stop]
+            stop = i
+            continue
+        if lo == 0:
+            if stop > 0:
+                yield 0, buf[:stop]
+            return
+        step = min(CHUNK, lo)
+        lo -= step
+        f.seek(lo)
+        buf = f.read(step) + buf[:stop]
+        stop = len(buf)
+
+
+class LogQuery:
+    def __init__(self, log_dir=LOG_DIR):
+        self.log_dir = log_dir
+        self._live = {}  # path -> in-memory index of segments still being written
+
+    # --- sparse index ---------------------------------------------------
+    def _scan(self, path, idx):
+        """Extend `idx` with the complete lines written since idx["size"]."""
+        with open(path, "rb") as f:
+            f.seek(idx["size"])
+            data = f.read()
+        offset = idx["size"]
+        users = set(idx["users"])
+        for line in data.split(b"\n")[:-1]:  # last piece is empty or torn
+            entry = json.loads(line)
+            if idx["count"] % MARK_EVERY == 0:
+                idx["marks"].append([entry["ts"], offset])
+            if idx["first_ts"] is None:
+                idx["first_ts"] = entry["ts"]
+            idx["last_ts"] = entry["ts"]
+            users.add(entry.get("user"))
+            idx["count"] += 1
+            offset += len(line) + 1
+        idx["size"] = offset
+        idx["users"] = sorted(users, key=str)
+        return idx
+
+    def segment_index(self, path):
+        sidecar = path + ".idx"
+        size = os.path.getsize(path)
+        if os.path.exists(sidecar):
+            with open(sidecar, "r") as f:
+                idx = json.load(f)
+            if idx["size"] == size:
+                return idx
+        idx = self._live.get(path)
+        if idx is None or idx["size"] > size:
+            idx = {"size": 0, "count": 0, "first_ts": None, "last_ts": None, "users": [], "marks": []}
+        if idx["size"] < size:
+            self._scan(path, idx)
+        segments = list_segments(self.log_dir)
+        if segments and path != segments[-1]:
+            # closed segment: persist so it is never scanned again
+            tmp = sidecar + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(idx, f)
+            os.replace(tmp, sidecar)
+            self._live.pop(path, None)
+        else:
+            self._live[path] = idx
+        return idx
+
+    # --- queries --------------------------------------------------------
+    def page(self, cursor=None, limit=50, user=None):
+        """Newest-first page of entries older than `cursor`.
+
+        Returns (entries, next_cursor); next_cursor is None once history is
+        exhausted. A cursor is (segment file name, byte offset).
+        """
+        segments = list_segments(self.log_dir)
+        names = [os.path.basename(p) for p in segments]
+        if cursor is None:
+            start, end = len(segments) - 1, None
+        else:
+            seg_name, end = cursor
+            start = bisect.bisect_left(names, seg_name)
+            if start >= len(names) or names[start] != seg_name:
+                start -= 1  # segment vanished (cleared): continue with older ones
+                end = None
+        out = []
+        for i in range(start, -1, -1):
+            path = segments[i]
+            if not os.path.exists(path):
+                continue
+            if user is not None and user not in self.segment_index(path)["users"]:
+                end = None
+                continue
+            with open(path, "rb") as f:
+                seg_end = os.path.getsize(path) if end is None else end
+                for offset, line in _lines_backwards(f, seg_end):
+                    entry = json.loads(line)
+                    if user is not None and entry.get("user") != user:
+                        continue
+                    out.append(entry)
+                    if len(out) >= limit:
+                        return out, (names[i], offset)
+            end = None
+        return out, None
+
+    def between(self, start_ts=None, end_ts=None, user=None):
+        """Yield entries with start_ts <= ts <= end_ts, oldest first."""
+        for path in list_segments(self.log_dir):
+            idx = self.segment_index(path)
+            if idx["count"] == 0:
+                continue
+            if start_ts is not None and idx["last_ts"] < start_ts:
+                continue
+            if end_ts is not None and idx["first_ts"] > end_ts:
+                break
+            if user is not None and user not in idx["users"]:
+                continue
+            offset = 0
+            if start_ts is not None and idx["marks"]:
+                k = bisect.bisect_right([m[0] for m in idx["marks"]], start_ts) - 1
+                offset = idx["marks"][max(k, 0)][1]
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    entry = json.loads(line)
+                    if start_ts is not None and entry["ts"] < start_ts:
+                        continue
+                    if end_ts is not None and entry["ts"] > end_ts:
+                        return
+                    if user is None or entry.get("user") == user:
+                        yield entry
+
+    def count(self):
+        return sum(self.segment_index(p)["count"] for p in list_segments(self.log_dir))
@@ -0,0 +1,196 @@
+# matcher.py
+import threading
+import numpy as np
+from ann_index import BruteForceIndex, load_index, save_index
+
+EMBEDDING_DIM = 128
+
+
+class FaceMatch:
+    """Best gallery match for one detected face, plus its top-k candidates."""
+    __slots__ = ("name", "distance", "topk")
+
+    def __init__(self, name, distance, topk):
+        self.name = name
+        self.distance = distance
+        self.topk = topk  # [(name, distance), ...] nearest first
+
+    def __repr__(self):
+        return f"FaceMatch({self.name!r}, {self.distance:.3f})"
+
+
+class GalleryMatcher:
+    """Decrypted gallery held as one contiguous float32 (capacity, 128) matrix.
+
+    Rows are slots; freed slots are reused so inserts and deletes never
+    rebuild the matrix. Squared row norms are kept alongside so a whole frame
+    of faces is scored with a single matrix product:
+        |q - g|^2 = |q|^2 + |g|^2 - 2 q.g
+    Distances are euclidean, the same metric as face_recognition.face_distance.
+
+    Lookups go through a pluggable index (see ann_index.py); the default
+    BruteForceIndex scores every row and is exact.
+    """
+
+    def __init__(self, names=(), encodings=(), capacity=None, dim=EMBEDDING_DIM, index=None):
+        names = list(names)
+        capacity = max(capacity or 0, len(names), 16)
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._names = [None] * capacity
+        self._slots = {}  # name -> slot
+        self._free = list(range(capacity - 1, -1, -1))
+        self.index = index or BruteForceIndex()
+        self.index.attach(self)
+        for name, enc in zip(names, encodings):
+            self.add(name, enc)
+        self.index.build()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, name):
+        return name in self._slots
+
+    @property
+    def names(self):
+        return list(self._slots)
+
+    @property
+    def matrix(self):
+        return self._matrix
+
+    @property
+    def sq_norms(self):
+        return self._sq_norms
+
+    @property
+    def live(self):
+        return self._live
+
+    def use_index(self, index, path=None, data_key=None):
+        """Switch to `index`, restoring it from `path` when the file matches.
+
+        Users missing from the persisted structure are inserted incrementally;
+        the index is rebuilt (and re-saved) only when it is missing, stale or
+        has degraded past its own rebuild threshold. The file is sealed under
+        the gallery's `data_key`; without one nothing is read or written.
+        """
+        with self._lock:
+            index.attach(self)
+            if data_key is None:
+                path = None
+            restored = path is not None and load_index(index, self._slots, path, data_key)
+            if restored:
+                covered = index.covered()
+                for name, slot in self._slots.items():
+                    if covered is not None and slot not in covered:
+                        index.add(slot, self._matrix[slot])
+            if not restored or index.needs_rebuild():
+                index.build()
+                restored = False
+            self.index = index
+            if path is not None and not restored:
+                self.save_index(path, data_key)
+            return restored
+
+    def save_index(self, path, data_key):
+        with self._lock:
+            save_index(self.index, self._names, path, data_key)
+
+    def _grow(self):
+        old = self._matrix.shape[0]
+        new = old * 2
+        matrix = np.zeros((new, self.dim), dtype=np.float32)
+        matrix[:old] = self._matrix
+        self._matrix = matrix
+        self._sq_norms = np.concatenate([self._sq_norms, np.zeros(new - old, dtype=np.float32)])
+        self._live = np.concatenate([self._live, np.zeros(new - old, dtype=bool)])
+        self._names.extend([None] * (new - old))
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    def add(self, name, encoding):
+        """Insert or replace `name`; returns the slot it occupies."""
+        vec = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is None:
+                if not self._free:
+                    self._grow()
+                slot = self._free.pop()
+                self._slots[name] = slot
+                self._names[slot] = name
+            self._matrix[slot] = vec
+            self._sq_norms[slot] = float(vec @ vec)
+            self._live[slot] = True
+            self.index.add(slot, vec)
+            return slot
+
+    def remove(self, name):
+        with self._lock:
+            slot = self._slots.pop(name, None)
+            if slot is None:
+                return False
+            self._live[slot] = False
+            self._names[slot] = None
+            self._matrix[slot] = 0.0
+            self._sq_norms[slot] = 0.0
+            self._free.append(slot)
+            self.index.remove(slot)
+            return True
+
+    def apply(self, added=None, removed=()):
+        """Apply a gallery delta as one step with respect to concurrent match().
+
+        `added` maps name -> encoding (new users or replaced embeddings);
+        entries identical to what is already loaded are skipped. Returns the
+        number of rows actually changed.
+        """
+        changed = 0
+        with self._lock:
+            for name in removed:
+                changed += self.remove(name)
+            for name, enc in (added or {}).items():
+                slot = self._slots.get(name)
+                vec = np.asarray(enc, dtype=np.float32).reshape(self.dim)
+                if slot is not None and np.array_equal(self._matrix[slot], vec):
+                    continue
+                self.add(name, vec)
+                changed += 1
+        return changed
+
+    def distances(self, queries):
+        """Euclidean distances, shape (faces, capacity); dead slots are +inf."""
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            d2 = self._sq_norms[None, :] - 2.0 * (q @ self._matrix.T)
+            d2 += np.einsum("ij,ij->i", q, q)[:, None]
+            np.maximum(d2, 0.0, out=d2)
+            d = np.sqrt(d2, out=d2)
+            d[:, ~self._live] = np.inf
+        return d
+
+    def match(self, queries, k=3):
+        """Score every face in a frame against the whole gallery in one call.
+
+        Returns one FaceMatch per query (None when the gallery is empty).
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if len(q) == 0:
+            return []
+        with self._lock:
+            n = len(self._slots)
+            if n == 0:
+                return [None] * len(q)
+            hits = self.index.search(q, max(1, min(k, n)))
+            results = []
+            for slots, dists in hits:
+                if len(slots) == 0:
+                    results.append(None)
+                    continue
+                topk = [(self._names[s], float(d)) for s, d in zip(slots.tolist(), dists.tolist())]
+                results.append(FaceMatch(topk[0][0], topk[0][1], topk))
+        return results
@@ -0,0 +1,263 @@
+# metrics.py
+"""In-process latency histograms and counters for the monitor.
+
+Histograms have fixed, log-spaced buckets, so memory stays constant no
+matter how long the monitor runs and observing a value is a bisect plus an
+increment. Snapshots can be exported as a Prometheus text file (for the
+node_exporter textfile collector), served over HTTP on localhost, or written
+as JSON.
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from events import get_logger
+
+PREFIX = "sentinel"
+# 50us .. ~30s, each bucket 1.25x the previous one
+BUCKETS = tuple(5e-5 * 1.25 ** i for i in range(60))
+
+log = get_logger("metrics")
+
+
+class Histogram:
+    __slots__ = ("_lock", "counts", "sum", "count")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating linearly inside one."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                lo = BUCKETS[i - 1] if i > 0 else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+    def summary(self):
+        if self.count == 0:
+            return {"count": 0}
+
+        def ms(seconds):
+            return round(seconds * 1000.0, 3)
+
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.sum / self.count),
+            "p50_ms": ms(self.quantile(0.5)),
+            "p90_ms": ms(self.quantile(0.9)),
+            "p99_ms": ms(self.quantile(0.99)),
+        }
+
+
+class _Timer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Per-stage latency histograms plus monotonically increasing counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}  # name -> zero-argument callable, read at export time
+        self.started_at = time.time()
+
+    def stage(self, name):
+        hist = self.stages.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(name, Histogram())
+        return hist
+
+    def observe(self, stage, seconds):
+        self.stage(stage).observe(seconds)
+
+    def time(self, stage):
+        """`with metrics.time("detect"): ...` records the block's duration."""
+        return _Timer(self.stage(stage))
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, read):
+        self.gauges[name] = read
+
+    def _gauge_values(self):
+        values = {}
+        for name, read in list(self.gauges.items()):
+            try:
+                values[name] = read()
+            except Exception:
+                continue
+        return values
+
+    # --- export ---------------------------------------------------------
+    def snapshot(self):
+        return {
+            "time": round(time.time(), 3),
+            "uptime": round(time.time() - self.started_at, 1),
+            "stages": {name: h.summary() for name, h in sorted(self.stages.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "gauges": self._gauge_values(),
+        }
+
+    def prometheus(self):
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Time spent per monitor stage.",
+            f"# TYPE {PREFIX}_stage_seconds histogram",
+        ]
+        for name, h in sorted(self.stages.items()):
+            with h._lock:
+                counts, total, count = list(h.counts), h.sum, h.count
+            cumulative = 0
+            for bound, c in zip(BUCKETS, counts):
+                cumulative += c
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{name}"}} {count}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        for name, value in sorted(self._gauge_values().items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def memory_gauges(metrics, trace=False):
+    """Gauges for allocation behaviour of the whole process.
+
+    `python_allocated_blocks` (live pymalloc blocks) is free to read. With
+    `trace`, tracemalloc also reports traced bytes, which include NumPy
+    array data; it slows allocation down, so leave it off outside profiling.
+    """
+    metrics.gauge("python_allocated_blocks", sys.getallocatedblocks)
+    if trace:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        metrics.gauge("traced_memory_bytes", lambda: tracemalloc.get_traced_memory()[0])
+        metrics.gauge("traced_memory_peak_bytes", lambda: tracemalloc.get_traced_memory()[1])
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class MetricsExporter:
+    """Writes the Prometheus text file and/or JSON snapshot every `interval` seconds."""
+
+    def __init__(self, metrics, textfile=None, json_path=None, interval=10.0):
+        self.metrics = metrics
+        self.textfile = textfile
+        self.json_path = json_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def export(self):
+        if self.textfile:
+            _write_atomic(self.textfile, self.metrics.prometheus())
+        if self.json_path:
+            _write_atomic(self.json_path, json.dumps(self.metrics.snapshot(), indent=2))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except OSError as e:
+                log.error("Failed to export metrics", error=e, every=60.0)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        try:
+            self.export()  # final numbers on shutdown
+        except OSError:
+            pass
+
+
+class MetricsHTTPServer:
+    """GET /metrics (Prometheus text) and /metrics.json on a background thread."""
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, ctype = registry.prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, ctype = json.dumps(registry.snapshot()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # keep scrapes out of the monitor's stdout
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
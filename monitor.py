@@ -1,127 +1,479 @@
-import os, json, time
-import cv2, numpy as np
-import face_recognition
-from animations import WelcomeOverlay
-from crypto_utils import load_rsa_keys, decrypt_encoding
-from overlay import LockOverlay
+import os, time, queue, threading
+import cv2
+import numpy as np
+from crypto_utils import load_rsa_keys
+from gallery_store import GALLERY_PATH, LEGACY_DB_PATH, open_gallery
+from gallery_watch import GalleryWatcher
+from overlay import LockOverlay, HeadlessOverlay
+from config import load_config
+from pipeline import FramePipeline
+from frame_sources import open_source
+from recognition import Recognizer, TOLERANCE
+from governor import Governor
+from encoding_pool import EncodingPool
+from matcher import GalleryMatcher
+from ann_index import make_index
+from access_log import AccessLogWriter, migrate_json_log
+from evidence import EvidenceRecorder
+from local_ipc import LineServer
+from metrics import Metrics, MetricsExporter, MetricsHTTPServer, memory_gauges
+from buffers import scratch
+import events
+import monitor_control
+import welcome_server
 import subprocess
 import sys
 
-def show_animation(name):
-    overlay = WelcomeOverlay(name)
-    overlay.show()
-
 DATA_DIR = "data"
-DB_PATH = os.path.join(DATA_DIR, "faces.json")
+DB_PATH = GALLERY_PATH
+INDEX_PATH = os.path.join(DATA_DIR, "faces.index.npz")
+LOG_PATH = os.path.join(DATA_DIR, "logs.json")
+LOG_DIR = os.path.join(DATA_DIR, "logs")
 priv_path = os.path.join(DATA_DIR, "private.pem")
 pub_path = os.path.join(DATA_DIR, "public.pem")
 
-if not (os.path.exists(priv_path) and os.path.exists(pub_path)):
-    raise RuntimeError("RSA keys not found. Run register.py first.")
-if not os.path.exists(DB_PATH):
-    raise RuntimeError("No registered users. Run register.py first.")
+GRACE_SECONDS = 2.0
+IDLE_POLL_SECONDS = 0.1  # command wait while capture is paused or stopped
+PREVIEW_WINDOW = "Camera Preview (press q to quit)"
 
-private_key, public_key = load_rsa_keys(priv_path, pub_path)
+log = events.get_logger("monitor")
 
-with open(DB_PATH, "r") as f:
-    db = json.load(f)
 
-names, encodings = [], []
-for uname, info in db["users"].items():
-    arr = decrypt_encoding(info["encoding"], private_key)
-    names.append(uname)
-    encodings.append(arr)
+class MonitorDaemon:
+    """Long-lived face monitor, driven over a local control socket.
 
-print("Loaded users:", names)
+    Models, keys and the decrypted gallery are loaded once; capture can then
+    be started, paused and stopped without paying for that again. The
+    control socket comes up first so clients can connect while loading and
+    block on `wait_ready` until `ready` is set. Commands that touch the
+    camera, the overlay or the gallery are queued and applied by the main
+    loop between frames; status queries are answered on the socket thread.
+    """
 
-overlay = LockOverlay(blur_radius=15)
-overlay_visible = False
+    def __init__(self, cfg=None):
+        self.cfg = cfg or load_config()
+        self.pipeline_cfg = self.cfg["pipeline"]
+        self.headless = self.cfg["display"]["headless"]
+        self.ready = threading.Event()
+        self.commands = queue.Queue()
+        self.token = monitor_control.new_token()
+        self.server = LineServer(*monitor_control.address(), self.handle, name="monitor")
+        self.state = "starting"
+        self.started_at = time.time()
+        self.running = True
 
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    raise RuntimeError("Could not open camera.")
+        self.cap = None
+        self.pipeline = None
+        self.encoder = None
+        self.governor = None
+        self.overlay = None
+        self.overlay_visible = False
+        self.welcome_proc = None
+        self.access_log = None
+        self.evidence = None
+        self.watcher = None
+        self.stats = Metrics()
+        self.exporters = []
 
-authorized = False
-last_seen_time = 0
-GRACE_SECONDS = 2.0
-TOLERANCE = 0.5
+        self.authorized = False
+        self.last_seen_time = 0
+        self.current_user = None
 
-LOG_PATH = os.path.join(DATA_DIR, "logs.json")
+    # --- start-up -----------------------------------------------------------
+    def _enabled(self, section):
+        opts = dict(self.cfg[section])
+        return opts.pop("enabled"), opts
+
+    def load(self):
+        if not (os.path.exists(priv_path) and os.path.exists(pub_path)):
+            raise RuntimeError("RSA keys not found. Run register.py first.")
+        if not (os.path.exists(DB_PATH) or os.path.exists(LEGACY_DB_PATH)):
+            raise RuntimeError("No registered users. Run register.py first.")
+        self.private_key, self.public_key = load_rsa_keys(priv_path, pub_path)
+        store = open_gallery(self.private_key, self.public_key, path=DB_PATH)
+        gallery_cfg = self.cfg["gallery"]
+        self.watcher = GalleryWatcher(store, self.private_key, self._on_gallery_change,
+                                      interval=gallery_cfg["poll_interval"])
+        self.recognizer = Recognizer(self._load_matcher(), self.cfg, self.stats, self.encoder)
+        enabled, opts = self._enabled("governor")
+        self.governor = Governor(**opts).attach(self.recognizer) if enabled else None
+        if gallery_cfg["watch"]:
+            self.watcher.start()
+
+        migrate_json_log(LOG_PATH, LOG_DIR)
+        self.access_log = AccessLogWriter(LOG_DIR, **self.cfg["access_log"]).start()
+        enabled, opts = self._enabled("evidence")
+        self.evidence = EvidenceRecorder(**opts).start() if enabled else None
+
+        self._register_gauges()
+        self._start_exporters()
+
+        if self.headless:
+            self.overlay = HeadlessOverlay()
+            return
+        # Long-lived welcome animation process, reused for every unlock
+        self.welcome_proc = welcome_server.spawn()
+        self.overlay = LockOverlay(blur_radius=15)
+
+    def _load_matcher(self):
+        # One RSA unwrap for the whole gallery, then a memory-mapped symmetric pass.
+        # The watcher keeps what was loaded as the baseline for later deltas.
+        gallery = self.watcher.load()
+        log.info("Loaded users", users=list(gallery.keys()))
+
+        matcher_cfg = self.cfg["matcher"]
+        matcher = GalleryMatcher(list(gallery.keys()), list(gallery.values()))
+        if matcher_cfg["index"] != "brute":
+            index = make_index(matcher_cfg["index"], **matcher_cfg.get(matcher_cfg["index"], {}))
+            data_key = self.watcher.store.unlock(self.private_key)
+            if not matcher.use_index(index, INDEX_PATH, data_key):
+                log.info("Built index", kind=index.kind, users=len(matcher))
+        return matcher
+
+    # --- control API (socket threads) ---------------------------------------
+    def handle(self, msg):
+        cmd = msg.get("cmd")
+        if cmd == "ping":
+            return {"ok": True}
+        if not monitor_control.check_token(msg, self.token):
+            return {"ok": False, "error": "unauthorized"}
+        if cmd == "status":
+            return self.status()
+        if cmd == "metrics":
+            return self.metrics()
+        if cmd == "wait_ready":
+            return {"ok": True, "ready": self.ready.wait(float(msg.get("wait", 0)))}
+        if cmd in monitor_control.COMMANDS:
+            self.commands.put(msg)
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown command {cmd!r}"}
+
+    def status(self):
+        return {
+            "ok": True,
+            "ready": self.ready.is_set(),
+            "state": self.state,
+            "authorized": self.authorized,
+            "user": self.current_user,
+            "users": len(self.recognizer.matcher) if self.ready.is_set() else None,
+            "uptime": round(time.time() - self.started_at, 1),
+            "pid": os.getpid(),
+            "governor": self.governor.snapshot() if self.governor is not None else None,
+        }
+
+    def metrics(self):
+        return dict(self.stats.snapshot(), ok=True)
+
+    def _register_gauges(self):
+        # read lazily at export time; components that are off raise and are skipped
+        g, r = self.stats.gauge, self.recognizer
+        g("users", lambda: len(r.matcher))
+        g("authorized", lambda: int(self.authorized))
+        g("dropped_frames", lambda: self.pipeline.frames.dropped)
+        g("dropped_results", lambda: self.pipeline.results.dropped)
+        g("full_scans", lambda: r.detector.full_scans)
+        g("roi_scans", lambda: r.detector.roi_scans)
+        g("tracks", lambda: len(r.tracker.tracks))
+        g("track_encodings", lambda: r.tracker.encodings)
+        g("motion_skipped", lambda: r.motion_gate.skipped)
+        g("embedding_cache_hits", lambda: r.embedding_cache.hits)
+        g("embedding_cache_misses", lambda: r.embedding_cache.misses)
+        g("recognition_rate", lambda: self.governor.rate)
+        g("detection_scale", lambda: r.detector.scale)
+        # steady state: allocations stop moving while reuses keep counting
+        g("frame_buffer_allocations", lambda: self.pipeline.buffers.allocations)
+        g("frame_buffer_reuses", lambda: self.pipeline.buffers.reuses)
+        g("scratch_allocations", lambda: scratch.allocations)
+        memory_gauges(self.stats, self.cfg["metrics"]["trace_memory"])
+        g("pooled_encode_frames", lambda: self.encoder.pooled_frames)
+        g("evidence_bytes", lambda: self.evidence.bytes)
+        g("evidence_evicted", lambda: self.evidence.evicted)
+
+    def _start_exporters(self):
+        mcfg = self.cfg["metrics"]
+        if mcfg["textfile"] or mcfg["json_path"]:
+            self.exporters.append(MetricsExporter(
+                self.stats, mcfg["textfile"], mcfg["json_path"], mcfg["interval"]).start())
+        if mcfg["http_port"]:
+            try:
+                self.exporters.append(MetricsHTTPServer(self.stats, mcfg["http_port"], mcfg["http_host"]).start())
+            except OSError as e:
+                log.warning("Metrics HTTP endpoint unavailable", error=e)
+
+    # --- commands (main thread) ---------------------------------------------
+    def _apply(self, msg):
+        cmd = msg["cmd"]
+        if cmd in ("start", "resume"):
+            self.start_capture()
+        elif cmd == "pause":
+            self.pause_capture()
+        elif cmd == "stop":
+            self.stop_capture()
+        elif cmd == "reload":
+            self.reload_gallery()
+        elif cmd == "gallery_delta":
+            self.apply_gallery_delta(msg["added"], msg["removed"])
+        elif cmd == "quit":
+            self.running = False
+
+    def start_capture(self):
+        if self.cap is None:
+            # Keep the driver from queueing frames behind our back; the capture
+            # stage drains the camera continuously and the pipeline drops anything stale.
+            source_cfg = self.cfg["source"]
+            cap = open_source(source_cfg["uri"], source_cfg["realtime"], source_cfg["loop"],
+                              buffer_size=self.pipeline_cfg["camera_buffer_size"])
+            if not cap.isOpened():
+                log.error("Could not open frame source", source=source_cfg["uri"])
+                self.state = "error"
+                return
+            self.cap = cap
+        if self.pipeline is None:
+            self.recognizer.reset()
+            process, throttle = self.recognizer.recognize, None
+            if self.governor is not None:
+                process, throttle = self.governor.wrap(process), self.governor.throttle
+            self.pipeline = FramePipeline(
+                self.cap, process,
+                workers=self.pipeline_cfg["recognition_workers"],
+                frame_queue_size=self.pipeline_cfg["frame_queue_size"],
+                result_queue_size=self.pipeline_cfg["result_queue_size"],
+                metrics=self.stats,
+                throttle=throttle,
+                tap=self.evidence.push if self.evidence is not None else None,
+            )
+            self.pipeline.start()
+        self.state = "running"
 
-def log_access(username):
-    entry = {"user": username, "time": time.strftime("%Y-%m-%d %H:%M:%S")}
-    if os.path.exists(LOG_PATH):
-        with open(LOG_PATH, "r") as f:
-            logs = json.load(f)
-    else:
-        logs = []
-    logs.append(entry)
-    with open(LOG_PATH, "w") as f:
-        json.dump(logs, f, indent=2)
-
-try:
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("[!] Failed to grab frame")
-            break
-
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        boxes = face_recognition.face_locations(rgb, model="hog")
-        encs = face_recognition.face_encodings(rgb, boxes)
-
-        matched, matched_name = False, None
-        for e in encs:
-            if len(encodings) == 0:
-                continue
-            dists = face_recognition.face_distance(encodings, e)
-            best_idx = np.argmin(dists)
-            best_dist = float(dists[best_idx])
-            print(f"[*] Distances: {dists}, best={best_dist:.3f}")  
-
-            if best_dist < TOLERANCE:
-                matched, matched_name = True, names[best_idx]
-                break
+    def pause_capture(self):
+        """Stop recognising but keep the camera open for a quick resume."""
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        self._unlock()
+        if self.cap is not None:
+            self.state = "paused"
+
+    def stop_capture(self):
+        self.pause_capture()
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        if not self.headless:
+            cv2.destroyAllWindows()
+        self.state = "stopped"
+
+    def reload_gallery(self):
+        # built off to the side and swapped in one assignment between frames
+        self.recognizer.matcher = self._load_matcher()
+        self.recognizer.reset()
+
+    def _on_gallery_change(self, added, removed):
+        # watcher thread: decryption already happened here, the swap waits
+        # for the main loop so it lands between frames
+        self.commands.put({"cmd": "gallery_delta", "added": added, "removed": removed})
+
+    def apply_gallery_delta(self, added, removed):
+        changed = self.recognizer.matcher.apply(added, removed)
+        if not changed:
+            return
+        log.info("Gallery updated", added=len(added), removed=len(removed))
+        # identities cached on tracks or reused frames may now be wrong
+        self.recognizer.invalidate()
+
+    def _unlock(self):
+        """Monitoring is off: nobody to enforce the lock for."""
+        self.authorized = False
+        self.current_user = None
+        if self.overlay_visible:
+            self.overlay.hide()
+            self.overlay_visible = False
+
+    # --- decision / UI (main thread) ----------------------------------------
+    def log_access(self, username):
+        self.access_log.log(username)
+
+    def record_intrusion(self, result):
+        """Unknown face while locked: keep the frames around it."""
+        if self.evidence is None:
+            return
+        path = self.evidence.trigger(faces=len(result.boxes), distance=result.distance)
+        if path is None:
+            return  # same incident, recording extended
+        self.stats.inc("intrusions")
+        log.warning("Unknown face while locked", faces=len(result.boxes), evidence=path)
+        self.access_log.log(None, event="intrusion", evidence=path)
+
+    def welcome(self, name):
+        if self.headless:
+            return
+        if welcome_server.send_welcome(name):
+            return
+        # server not reachable: fall back to a one-off process
+        script_dir = os.path.abspath(os.path.dirname(__file__))
+        runner_path = os.path.join(script_dir, "welcome_anim_runner.py")
+        try:
+            subprocess.Popen([sys.executable, runner_path, name])
+        except Exception as e:
+            log.warning("Failed to launch welcome animation", error=e)
+
+    def on_result(self, result):
+        self.stats.inc("frames")
+        if result.reused:
+            self.stats.inc("reused_frames")
+        self.stats.observe("recognition", result.latency)
 
         current_time = time.time()
-        if matched:
-            last_seen_time = current_time
-            if not authorized:
-                print(f"[+] Authorized: {matched_name} (dist < {TOLERANCE})")
-                log_access(matched_name)
-                script_dir = os.path.abspath(os.path.dirname(__file__))
-                runner_path = os.path.join(script_dir, "welcome_anim_runner.py")
-                try:
-                    subprocess.Popen([sys.executable, runner_path, matched_name])
-                except Exception as e:
-                    print("[!] Failed to launch welcome animation:", e)
-            authorized = True
-
-            if overlay_visible:
-                overlay.hide()        
-                overlay_visible = False
+        if result.matched:
+            self.last_seen_time = current_time
+            if not self.authorized:
+                log.info("Authorized", user=result.matched_name, tolerance=TOLERANCE)
+                self.stats.inc("unlocks")
+                self.log_access(result.matched_name)
+                self.welcome(result.matched_name)
+            self.authorized = True
+            self.current_user = result.matched_name
+
+            if self.overlay_visible:
+                with self.stats.time("overlay"):
+                    self.overlay.hide()
+                self.overlay_visible = False
         else:
-            if authorized and (current_time - last_seen_time) < GRACE_SECONDS:
-                print("[~] Grace period active, staying unlocked")
+            if self.authorized and (current_time - self.last_seen_time) < GRACE_SECONDS:
+                # repeats on every frame while the owner is out of view
+                log.info("Grace period active, staying unlocked", every=5.0)
             else:
-                if authorized:
-                    print("[-] Locking screen (no face match)")
-                authorized = False
+                if self.authorized:
+                    log.warning("Locking screen", reason="no face match")
+                self.authorized = False
+                self.current_user = None
+
+                if not self.overlay_visible:
+                    self.stats.inc("locks")
+                    with self.stats.time("overlay"):
+                        self.overlay.show()
+                    self.overlay_visible = True
+                if result.boxes:
+                    self.record_intrusion(result)
 
-                if not overlay_visible:
-                    overlay.show()     
-                    overlay_visible = True
+        if self.governor is not None:
+            self.governor.update(result, self.authorized)
 
-        for (top, right, bottom, left) in boxes:
-            color = (0, 255, 0) if matched else (0, 0, 255)
+    def show_preview(self, result):
+        if self.headless:
+            return
+        # draw on a copy: the pooled frame is shared with the evidence recorder
+        frame = scratch.get("preview", result.frame.image.shape)
+        np.copyto(frame, result.frame.image)
+        for (top, right, bottom, left) in result.boxes:
+            color = (0, 255, 0) if result.matched else (0, 0, 255)
             cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+        cv2.imshow(PREVIEW_WINDOW, frame)
+
+    def _poll_ui(self):
+        """Let OpenCV's window process events; True when 'q' was pressed."""
+        if self.pipeline is None or self.headless:
+            return False  # the loop already blocks in next_result() or on the command queue
+        return cv2.waitKey(self.pipeline_cfg["ui_poll_ms"]) & 0xFF == ord('q')
+
+    def run(self):
+        # Encoding workers are forked before any other thread exists, the
+        # event-log writer included: nothing may log until they are up
+        enabled, opts = self._enabled("encoding")
+        self.encoder = EncodingPool(**opts).warm() if enabled else None
+        ev = self.cfg["events"]
+        events.setup(ev["level"], ev["format"], ev["path"], ev["queue_size"], ev["timestamps"])
+        self.server.start()
+        log.info("Monitor control socket", path=self.server.path)
+        try:
+            self.load()
+            self.start_capture()
+            self.ready.set()
+            log.info("Monitor ready")
+            while self.running:
+                # Paused or stopped, nothing else needs the loop: block on the
+                # command queue rather than spinning at the UI poll rate.
+                idle = self.pipeline is None and not self.overlay.animating
+                try:
+                    msg = self.commands.get(timeout=IDLE_POLL_SECONDS) if idle else self.commands.get_nowait()
+                    while True:
+                        self._apply(msg)
+                        msg = self.commands.get_nowait()
+                except queue.Empty:
+                    pass
+
+                # Overlay animations are Tk `after` callbacks; pumping them here
+                # keeps show()/hide() non-blocking while frames keep flowing.
+                with self.stats.time("overlay_pump"):
+                    self.overlay.pump()
+                if self.pipeline is None:
+                    self._poll_ui()
+                    continue
+                result = self.pipeline.next_result(timeout=0.02)
+                if result is None:
+                    if not self.pipeline.running:
+                        log.warning("Frame source ended")
+                        self.stop_capture()
+                    elif self._poll_ui():
+                        break
+                    continue
+
+                self.on_result(result)
+                with self.stats.time("display"):
+                    self.show_preview(result)
+                    quit_pressed = self._poll_ui()
+                # capture -> decision -> on screen
+                self.stats.observe("frame", time.time() - result.frame.timestamp)
+                if quit_pressed:
+                    break
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.state = "stopping"
+        self.server.close()
+        for exporter in self.exporters:
+            exporter.close()
+        if self.watcher is not None:
+            self.watcher.close()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        if self.evidence is not None:
+            self.evidence.close()
+        if self.access_log is not None:
+            self.access_log.close()
+        if self.cap is not None:
+            self.cap.release()
+        if not self.headless:
+            cv2.destroyAllWindows()
+        if self.overlay is not None:
+            self.overlay.destroy()
+        if self.encoder is not None:
+            self.encoder.close()
+        if self.welcome_proc is not None:
+            self.welcome_proc.terminate()
 
-        cv2.imshow("Camera Preview (press q to quit)", frame)
-        if cv2.waitKey(30) & 0xFF == ord('q'):
-            break
 
-finally:
-    cap.release()
-    cv2.destroyAllWindows()
-    if overlay_visible:
-        overlay.hide()
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Sentinel monitor daemon")
+    ap.add_argument("--source", help="camera:N, video file, image directory or synthetic[:WxH] "
+                                     "(default: source.uri from the config)")
+    ap.add_argument("--headless", action="store_true",
+                    help="no preview window, lock overlay or welcome animation")
+    ap.add_argument("--loop", action="store_true", help="restart a recorded source at the end")
+    ap.add_argument("--log-level", help="DEBUG, INFO, WARNING or ERROR (default: events.level)")
+    ap.add_argument("--log-json", action="store_true", help="log one JSON object per line")
+    args = ap.parse_args()
+    cfg = load_config()
+    if args.source is not None:
+        cfg["source"]["uri"] = args.source
+    if args.headless:
+        cfg["display"]["headless"] = True
+    if args.loop:
+        cfg["source"]["loop"] = True
+    if args.log_level:
+        cfg["events"]["level"] = args.log_level
+    if args.log_json:
+        cfg["events"]["format"] = "json"
+    MonitorDaemon(cfg).run()
@@ -0,0 +1,102 @@
+# monitor_control.py
+"""Client side of the monitor daemon's control socket.
+
+Kept free of the heavy recognition imports so the admin panel can drive the
+daemon without loading dlib itself. Every command is one JSON line,
+{"cmd": ..., ...}, answered with one JSON object; see MonitorDaemon.handle.
+
+Pausing or stopping the monitor lifts the lock screen, so every command but
+`ping` must carry the token the daemon writes to data/monitor.token at
+start-up. The file is readable by its owner only; on the loopback TCP
+fallback that is what keeps other local users from unlocking the screen.
+"""
+import os
+import sys
+import time
+import hmac
+import secrets
+import subprocess
+from local_ipc import request, ping
+
+script_dir = os.path.abspath(os.path.dirname(__file__))
+
+DATA_DIR = "data"
+SOCKET_PATH = os.path.join(DATA_DIR, "monitor.sock")
+TOKEN_PATH = os.path.join(DATA_DIR, "monitor.token")
+TCP_PORT = 47812
+COMMANDS = ("start", "stop", "pause", "resume", "reload", "quit")
+
+
+def address():
+    return os.path.join(script_dir, SOCKET_PATH), TCP_PORT
+
+
+def _token_path():
+    return os.path.join(script_dir, TOKEN_PATH)
+
+
+def new_token():
+    """Daemon side: write a fresh owner-only token and return it."""
+    path = _token_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    token = secrets.token_hex(32)
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.unlink(tmp)
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    os.replace(tmp, path)
+    return token
+
+
+def read_token():
+    try:
+        with open(_token_path(), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def check_token(msg, token):
+    return hmac.compare_digest(str(msg.get("token", "")), token)
+
+
+def send(cmd, timeout=1.0, **args):
+    """Send one command and return the reply (raises OSError if the daemon is down)."""
+    return request(*address(), dict(args, cmd=cmd, token=read_token()), timeout)
+
+
+def is_running():
+    return ping(*address())
+
+
+def spawn():
+    """Start the daemon in the background unless one is already up."""
+    if is_running():
+        return None
+    return subprocess.Popen([sys.executable, os.path.join(script_dir, "monitor.py")], cwd=script_dir)
+
+
+def wait_ready(timeout=60.0, proc=None):
+    """Block until the daemon reports models, gallery and camera are up.
+
+    Retries the connection while the daemon is still starting its control
+    socket; gives up early if `proc` (from spawn) has already exited.
+    """
+    deadline = time.time() + timeout
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        if proc is not None and proc.poll() is not None:
+            return False
+        try:
+            wait = min(remaining, 5.0)
+            reply = send("wait_ready", timeout=wait + 1.0, wait=wait)
+            if reply.get("ready"):
+                return True
+            if not reply.get("ok"):
+                time.sleep(0.2)  # e.g. a stale token until the new daemon has written its own
+        except (OSError, ValueError):
+            time.sleep(0.2)
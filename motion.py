@@ -0,0 +1,78 @@
+# motion.py
+import threading
+import time
+import cv2
+import numpy as np
+from buffers import scratch
+
+
+class MotionGate:
+    """Decides whether a frame needs the full detection/encoding pass.
+
+    Frames are compared, at a small working width, with the frame the last
+    full recognition ran on. While less than `min_changed` of the pixels
+    differ by more than `pixel_threshold` grey levels the scene is considered
+    static and the previous result is reused. A full pass is forced at least
+    every `max_staleness` seconds; keep that below the monitor's grace period
+    so the lock decision is never based on an older result than before.
+    """
+
+    def __init__(self, width=160, pixel_threshold=12, min_changed=0.01, max_staleness=1.0):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._reference = None
+        self._reference_time = 0.0
+        self._last_result = None
+        self.last_motion = 0.0  # when a change above min_changed was last seen
+        self.skipped = 0
+        self.ran = 0
+
+    def _small_gray(self, image):
+        """Blurred grey thumbnail, in this thread's scratch buffers."""
+        h, w = image.shape[:2]
+        height = max(1, int(h * self.width / w))
+        shape = (height, self.width)
+        small = cv2.resize(image, (self.width, height), dst=scratch.get("motion_small", shape + image.shape[2:]),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=scratch.get("motion_gray", shape))
+        return cv2.GaussianBlur(gray, (5, 5), 0, dst=scratch.get("motion_blur", shape))
+
+    def changed_fraction(self, small):
+        if self._reference is None or self._reference.shape != small.shape:
+            return 1.0
+        diff = cv2.absdiff(small, self._reference, dst=scratch.get("motion_diff", small.shape))
+        cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=diff)
+        return cv2.countNonZero(diff) / diff.size
+
+    def reusable(self, image, now=None):
+        """Previous result if the scene is unchanged, else None (run the full pass)."""
+        now = time.time() if now is None else now
+        small = self._small_gray(image)
+        with self._lock:
+            stale = now - self._reference_time >= self.max_staleness
+            moved = self.changed_fraction(small) >= self.min_changed
+            if self._last_result is not None and not stale and not moved:
+                self.skipped += 1
+                return self._last_result
+            if moved:
+                self.last_motion = now
+            if self._reference is None or self._reference.shape != small.shape:
+                self._reference = small.copy()
+            else:
+                np.copyto(self._reference, small)  # `small` is a scratch buffer
+            self._reference_time = now
+            self.ran += 1
+            return None
+
+    def remember(self, result):
+        with self._lock:
+            self._last_result = result
+
+    def reset(self):
+        """Forget the reference so the next frame always runs the full pass."""
+        with self._lock:
+            self._reference = None
+            self._last_result = None
@@ -1,28 +1,101 @@
 # overlay.py
 import tkinter as tk
-from PIL import Image, ImageTk, ImageFilter, ImageGrab, ImageEnhance
+from PIL import ImageTk
 import time
+from screen_capture import shared_backdrop
+
+
+class Animator:
+    """Frame-timed animations driven by Tk `after` callbacks.
+
+    Each animation runs on a named channel; starting a new animation on a
+    channel cancels the one already running there, so a fade-in can be
+    reversed mid-way. Nothing here sleeps: the owner only has to keep the Tk
+    event loop pumping (mainloop, or `root.update()` from its own loop).
+    """
+
+    def __init__(self, root, frame_ms=16):
+        self.root = root
+        self.frame_ms = frame_ms
+        self._jobs = {}
+
+    def run(self, channel, duration, step, on_done=None):
+        """Call step(progress 0..1) every frame for `duration` seconds."""
+        self.cancel(channel)
+        start = time.time()
+
+        def tick():
+            progress = 1.0 if duration <= 0 else min(1.0, (time.time() - start) / duration)
+            step(progress)
+            if progress < 1.0:
+                self._jobs[channel] = self.root.after(self.frame_ms, tick)
+            else:
+                self._jobs.pop(channel, None)
+                if on_done:
+                    on_done()
+
+        tick()
+
+    def repeat(self, channel, interval_ms, step, count=None):
+        """Call step(i) every `interval_ms`, `count` times (forever if None)."""
+        self.cancel(channel)
+
+        def tick(i=0):
+            if count is not None and i >= count:
+                self._jobs.pop(channel, None)
+                return
+            step(i)
+            self._jobs[channel] = self.root.after(interval_ms, tick, i + 1)
+
+        tick()
+
+    @property
+    def active(self):
+        """True while any animation still has frames scheduled."""
+        return bool(self._jobs)
+
+    def cancel(self, channel):
+        job = self._jobs.pop(channel, None)
+        if job is not None:
+            try:
+                self.root.after_cancel(job)
+            except tk.TclError:
+                pass
+
+    def cancel_all(self):
+        for channel in list(self._jobs):
+            self.cancel(channel)
+
 
 class LockOverlay:
-    def __init__(self, blur_radius=15):
+    FADE_IN_SECONDS = 0.25
+    FADE_OUT_SECONDS = 0.2
+    PULSE_MS = 200
+    PULSE_COUNT = 20  # ten red/bright cycles, as before
+    BRIGHTNESS = 0.3
+
+    def __init__(self, blur_radius=15, backdrop=None):
         # Fullscreen overlay window
         self.root = tk.Tk()
         self.root.attributes("-fullscreen", True)
         self.root.attributes("-topmost", True)
         self.root.overrideredirect(True)
         self.root.attributes("-alpha", 0.0)  # start fully transparent
+        self.root.withdraw()
+        self.animator = Animator(self.root)
+        self.alpha = 0.0
 
-        # Grab current screen and blur + darken it
-        screenshot = ImageGrab.grab()
-        blurred = screenshot.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-        darkened = ImageEnhance.Brightness(blurred).enhance(0.3)
-
-        self.bg_img = ImageTk.PhotoImage(darkened)
+        # Blurred + darkened screen grab, shared with WelcomeOverlay and
+        # refreshed on show() once the cached grab is stale
+        self.blur_radius = blur_radius
+        self.backdrop = backdrop or shared_backdrop()
+        self._bg_source = self.backdrop.get(self.blur_radius, self.BRIGHTNESS)
+        self.bg_img = ImageTk.PhotoImage(self._bg_source)
 
         # Canvas setup
         self.canvas = tk.Canvas(self.root, width=self.bg_img.width(), height=self.bg_img.height(), highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
-        self.canvas.create_image(0, 0, image=self.bg_img, anchor="nw")
+        self.bg_item = self.canvas.create_image(0, 0, image=self.bg_img, anchor="nw")
 
         # Lock text
         self.text_id = self.canvas.create_text(
@@ -44,38 +117,82 @@ class LockOverlay:
 
         self.visible = False
 
+    def _set_alpha(self, alpha):
+        self.alpha = alpha
+        self.root.attributes("-alpha", alpha)
+
+    def _fade(self, target, duration, on_done=None):
+        start = self.alpha
+        # scale the duration so a reversed half-finished fade is not slower
+        duration *= abs(target - start)
+        self.animator.run("fade", duration,
+                          lambda p: self._set_alpha(start + (target - start) * p), on_done)
+
+    def _refresh_background(self):
+        source = self.backdrop.get(self.blur_radius, self.BRIGHTNESS)
+        if source is not self._bg_source:
+            self._bg_source = source
+            self.bg_img = ImageTk.PhotoImage(source)
+            self.canvas.itemconfig(self.bg_item, image=self.bg_img)
+
+    def _pulse(self, i):
+        self.canvas.itemconfig(self.text_id, fill="#ff5555" if i % 2 == 0 else "#ff0000")
+
     def show(self):
-        """Fade in with pulsing effect."""
+        """Start fading in (then pulse the text); returns immediately."""
         if self.visible:
             return
         self.visible = True
+        if self.alpha == 0.0:
+            # fully hidden, so the grab cannot contain the overlay itself
+            self._refresh_background()
         self.root.deiconify()
-
-        # Fade in
-        for i in range(0, 100, 8):
-            self.root.attributes("-alpha", i / 100)
-            self.root.update()
-            time.sleep(0.02)
-
-        # Pulse text while visible
-        pulse_count = 0
-        while self.visible and pulse_count < 10:
-            self.canvas.itemconfig(self.text_id, fill="#ff5555")
-            self.root.update()
-            time.sleep(0.2)
-            self.canvas.itemconfig(self.text_id, fill="#ff0000")
-            self.root.update()
-            time.sleep(0.2)
-            pulse_count += 1
+        self._fade(1.0, self.FADE_IN_SECONDS,
+                   lambda: self.animator.repeat("pulse", self.PULSE_MS, self._pulse, self.PULSE_COUNT))
 
     def hide(self):
-        """Fade out and hide overlay."""
+        """Start fading out; the window is withdrawn when the fade completes."""
         if not self.visible:
             return
-        # Smooth fade out
-        for i in range(100, -1, -10):
-            self.root.attributes("-alpha", i / 100)
+        self.visible = False
+        self.animator.cancel("pulse")
+        self._fade(0.0, self.FADE_OUT_SECONDS, self.root.withdraw)
+
+    @property
+    def animating(self):
+        return self.animator.active
+
+    def pump(self):
+        """Run pending Tk events and animation frames without blocking."""
+        try:
             self.root.update()
-            time.sleep(0.02)
-        self.root.withdraw()
+        except tk.TclError:
+            pass
+
+    def destroy(self):
+        self.animator.cancel_all()
+        try:
+            self.root.destroy()
+        except tk.TclError:
+            pass
+
+
+class HeadlessOverlay:
+    """Stand-in for LockOverlay when there is no display (servers, replay)."""
+
+    animating = False
+
+    def __init__(self):
+        self.visible = False
+
+    def show(self):
+        self.visible = True
+
+    def hide(self):
         self.visible = False
+
+    def pump(self):
+        pass
+
+    def destroy(self):
+        pass
@@ -0,0 +1,239 @@
+# pipeline.py
+import threading
+import time
+from collections import deque
+from buffers import FramePool
+from events import get_logger
+
+log = get_logger("pipeline")
+
+
+class LatestQueue:
+    """Bounded queue where putting into a full queue drops the oldest item.
+
+    Consumers therefore always see the newest data instead of a backlog of
+    stale frames. With `block=True` a full queue makes `put` wait instead,
+    for offline replay where every frame must be processed.
+    """
+
+    def __init__(self, maxsize=1, block=False):
+        self.maxsize = max(1, int(maxsize))
+        self.block = block
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self.block:
+                while len(self._items) >= self.maxsize and not self._closed:
+                    self._cond.wait()
+            if self._closed:
+                return
+            while len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            if self.block:
+                self._cond.notify_all()  # producers wait on the same condition
+            else:
+                self._cond.notify()
+
+    def get(self, timeout=None):
+        """Pop the oldest queued item, or return None on timeout / close."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                item = self._items.popleft()
+                if self.block:
+                    self._cond.notify_all()  # wake a producer waiting for room
+                return item
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class Frame:
+    """A captured camera frame tagged with its sequence number and timestamp."""
+    __slots__ = ("seq", "timestamp", "image", "__weakref__")  # weakref: FramePool recycling
+
+    def __init__(self, seq, timestamp, image):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.image = image
+
+
+class FrameResult:
+    """Recognition output for one frame, handed to the decision/UI stage."""
+
+    def __init__(self, frame, boxes, matched=False, matched_name=None, distance=None, reused=False):
+        self.frame = frame
+        self.boxes = boxes
+        self.matched = matched
+        self.matched_name = matched_name
+        self.distance = distance
+        self.reused = reused  # True when carried over from an earlier frame
+        self.done_time = time.time()
+
+    def for_frame(self, frame):
+        """This result re-issued for a newer frame of an unchanged scene."""
+        return FrameResult(frame, self.boxes, self.matched, self.matched_name, self.distance, reused=True)
+
+    @property
+    def latency(self):
+        """Seconds between frame capture and the end of recognition."""
+        return self.done_time - self.frame.timestamp
+
+
+class CaptureStage(threading.Thread):
+    """Reads the camera as fast as it delivers and publishes the newest frame.
+
+    Frames are decoded into buffers from `pool`, which get them back once
+    every stage is done with the frame. `tap(frame)`, when given, sees every
+    captured frame and must return immediately (e.g. the evidence recorder).
+    """
+
+    def __init__(self, cap, out_queue, stop_event, metrics=None, pool=None, tap=None):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.metrics = metrics
+        self.pool = pool if pool is not None else FramePool()
+        self.tap = tap
+        self.failed = False
+        self.seq = 0  # frames read so far
+        self._shape = None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            buf = self.pool.acquire(self._shape) if self._shape is not None else None
+            start = time.perf_counter()
+            ret, image = self.cap.read(buf)
+            if self.metrics is not None:
+                self.metrics.observe("capture", time.perf_counter() - start)
+            if not ret:
+                # the end of a recording is expected; a camera that stops delivering is not
+                self.failed = not getattr(self.cap, "ended", False)
+                if self.failed:
+                    log.warning("Failed to grab frame")
+                break
+            if image is not buf:
+                # first frame, a resolution change, or a source that cannot
+                # decode in place: the pool adopts the new array
+                self._shape = image.shape
+                self.pool.count(image)
+                if buf is not None:
+                    self.pool.release(buf)
+            self.seq += 1
+            frame = Frame(self.seq, time.time(), image)
+            self.pool.bind(frame, image)
+            if self.tap is not None:
+                self.tap(frame)
+            self.out_queue.put(frame)
+        self.out_queue.close()
+
+
+class RecognitionStage(threading.Thread):
+    """Runs `process(frame) -> FrameResult` on the newest available frame.
+
+    `throttle(stop_event)`, when given, is called before each frame is taken
+    and may block to limit the recognition rate; waiting there (rather than
+    after taking a frame) keeps the frame that is processed fresh.
+    """
+
+    def __init__(self, index, process, in_queue, out_queue, stop_event, throttle=None):
+        super().__init__(name=f"recognition-{index}", daemon=True)
+        self.process = process
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.throttle = throttle
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.throttle is not None:
+                self.throttle(self.stop_event)
+            frame = self.in_queue.get(timeout=0.1)
+            if frame is None:
+                if self.in_queue.closed:
+                    break
+                continue
+            try:
+                result = self.process(frame)
+            except Exception as e:
+                log.error("Recognition failed", frame=frame.seq, error=e, every=5.0)
+                continue
+            if result is not None:
+                self.out_queue.put(result)
+
+
+class FramePipeline:
+    """Capture -> detection/encoding workers -> decision/UI stage.
+
+    The stages are connected by LatestQueues, so a slow recognition pass never
+    stalls capture and the decision stage always acts on the newest frame.
+    `lossless=True` makes capture wait for the workers instead (replaying
+    recorded footage as fast as it can be recognised).
+    """
+
+    def __init__(self, cap, process, workers=1, frame_queue_size=1, result_queue_size=1, metrics=None,
+                 lossless=False, throttle=None, tap=None):
+        self.stop_event = threading.Event()
+        self.frames = LatestQueue(frame_queue_size, block=lossless)
+        self.results = LatestQueue(result_queue_size)
+        self.buffers = FramePool()
+        self.capture = CaptureStage(cap, self.frames, self.stop_event, metrics, self.buffers, tap)
+        self.workers = [
+            RecognitionStage(i, process, self.frames, self.results, self.stop_event, throttle)
+            for i in range(max(1, int(workers)))
+        ]
+        self._last_seq = 0
+
+    def start(self):
+        self.capture.start()
+        for w in self.workers:
+            w.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        self.frames.close()
+        self.results.close()
+        self.capture.join(timeout)
+        for w in self.workers:
+            w.join(timeout)
+
+    @property
+    def running(self):
+        return self.capture.is_alive() or any(w.is_alive() for w in self.workers)
+
+    @property
+    def failed(self):
+        return self.capture.failed
+
+    def next_result(self, timeout=None):
+        """Return the next result newer than the last one returned, or None.
+
+        With several workers results can finish out of order; anything older
+        than what the decision stage has already acted on is discarded.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            result = self.results.get(remaining)
+            if result is None:
+                return None
+            if result.frame.seq > self._last_seq:
+                self._last_seq = result.frame.seq
+                return result
+            if deadline is not None and time.time() >= deadline:
+                return None
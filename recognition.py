@@ -0,0 +1,139 @@
+# recognition.py
+import cv2
+import face_recognition
+from config import load_config
+from pipeline import FrameResult
+from motion import MotionGate
+from tracker import FaceTracker
+from embedding_cache import EmbeddingCache
+from detection import make_detector
+from metrics import Metrics
+from buffers import scratch
+
+TOLERANCE = 0.5
+
+
+def _enabled(cfg, section):
+    opts = dict(cfg[section])
+    return opts.pop("enabled"), opts
+
+
+class Recognizer:
+    """Detection, tracking, encoding and matching for one frame.
+
+    `recognize(frame) -> FrameResult` is what the pipeline's workers run.
+    The monitor daemon, the benchmarks and the replay runner all build one
+    from the same config so they measure the same code path. `matcher` may
+    be swapped or updated in place between frames; call `invalidate()`
+    afterwards so cached identities are re-checked.
+    """
+
+    def __init__(self, matcher, cfg=None, stats=None, encoder=None, tolerance=TOLERANCE):
+        cfg = cfg or load_config()
+        self.matcher = matcher
+        self.stats = stats if stats is not None else Metrics()
+        self.encoder = encoder
+        self.tolerance = tolerance
+        self.top_k = cfg["matcher"]["top_k"]
+        self.detector = make_detector(cfg)
+        enabled, opts = _enabled(cfg, "tracker")
+        self.tracker = FaceTracker(**opts) if enabled else None
+        enabled, opts = _enabled(cfg, "motion")
+        self.motion_gate = MotionGate(**opts) if enabled else None
+        # tracks already carry their identity, so the cache only serves the untracked path
+        enabled, opts = _enabled(cfg, "embedding_cache")
+        self.embedding_cache = EmbeddingCache(**opts) if enabled and self.tracker is None else None
+
+    def encode_faces(self, rgb, boxes):
+        if self.encoder is None:
+            return face_recognition.face_encodings(rgb, boxes)
+        return self.encoder.encode(rgb, boxes)
+
+    def recognize(self, frame):
+        """Detection/encoding/matching stage, run on the recognition workers."""
+        if self.motion_gate is not None:
+            previous = self.motion_gate.reusable(frame.image, frame.timestamp)
+            if previous is not None:
+                # static scene: skip HOG and encoding, reuse the last decision
+                return previous.for_frame(frame)
+            result = self._recognize(frame)
+            self.motion_gate.remember(result)
+            return result
+        return self._recognize(frame)
+
+    def _recognize(self, frame):
+        matcher, stats = self.matcher, self.stats
+        with stats.time("color"):
+            # per-thread buffer; nothing keeps `rgb` past this frame
+            rgb = cv2.cvtColor(frame.image, cv2.COLOR_BGR2RGB, dst=scratch.get("rgb", frame.image.shape))
+        with stats.time("detect"):
+            boxes = self.detector.detect(rgb)
+        stats.inc("faces", len(boxes))
+
+        if self.tracker is None:
+            found = self._encode_and_match(matcher, rgb, boxes, frame.timestamp)
+            return self._decide(frame, boxes, [m for m in found if m is not None])
+
+        # Only new, due-for-reverification or drifted faces pay for encoding;
+        # the rest reuse the identity cached on their track.
+        tracker = self.tracker
+        tracks = [t for t in tracker.update(frame, boxes) if t.visible]
+        pending = [t for t in tracks if tracker.needs_encoding(t, frame.timestamp)]
+        if pending:
+            with stats.time("encode"):
+                encs = self.encode_faces(rgb, [t.box for t in pending])
+            with stats.time("match"):
+                found = matcher.match(encs, k=self.top_k)
+            for track, match in zip(pending, found):
+                tracker.verified(track, match, frame.timestamp)
+        matches = [t.match for t in tracks if t.match is not None]
+        return self._decide(frame, [t.box for t in tracks], matches)
+
+    def _encode_and_match(self, matcher, rgb, boxes, now):
+        """One match (or None) per box; faces seen a moment ago come from the cache."""
+        cache, stats = self.embedding_cache, self.stats
+        if cache is None:
+            keys, found = None, [None] * len(boxes)
+            missing = list(range(len(boxes)))
+        else:
+            with stats.time("fingerprint"):
+                keys = [cache.key(rgb, box) for box in boxes]
+                cached = [cache.get(key, now) for key in keys]
+            found = [hit[1] if hit is not None else None for hit in cached]
+            missing = [i for i, hit in enumerate(cached) if hit is None]
+        if missing:
+            with stats.time("encode"):
+                encs = self.encode_faces(rgb, [boxes[i] for i in missing])
+            with stats.time("match"):
+                fresh = matcher.match(encs, k=self.top_k)
+            for i, enc, match in zip(missing, encs, fresh):
+                found[i] = match
+                if cache is not None:
+                    cache.put(keys[i], now, enc, match)
+        return found
+
+    def _decide(self, frame, boxes, matches):
+        if matches:
+            best = min(matches, key=lambda m: m.distance)
+            if best.distance < self.tolerance:
+                return FrameResult(frame, boxes, True, best.name, best.distance)
+        return FrameResult(frame, boxes)
+
+    def invalidate(self):
+        """Gallery changed: re-verify cached identities, keep tracks."""
+        if self.tracker is not None:
+            self.tracker.invalidate()
+        if self.embedding_cache is not None:
+            self.embedding_cache.clear()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+    def reset(self):
+        """Start from scratch (new capture session or a different gallery)."""
+        if self.tracker is not None:
+            self.tracker.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.embedding_cache is not None:
+            self.embedding_cache.clear()
+        self.detector.reset()
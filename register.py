@@ -1,68 +1,108 @@
 import os
-import json
 import cv2
 import face_recognition
 import numpy as np
-from crypto_utils import generate_rsa_keys, load_rsa_keys, encrypt_encoding
+from crypto_utils import generate_rsa_keys, load_rsa_keys
+from ann_index import update_index_file
+from gallery_store import GALLERY_PATH, open_gallery
+from detection import make_detector
+from config import load_config
+from frame_sources import CameraSource, open_source
+from events import get_logger
 
 DATA_DIR = "data"
-DB_PATH = os.path.join(DATA_DIR, "faces.json")
+DB_PATH = GALLERY_PATH
+INDEX_PATH = os.path.join(DATA_DIR, "faces.index.npz")
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
+log = get_logger("register")
+
 priv_path = os.path.join(DATA_DIR, "private.pem")
 pub_path = os.path.join(DATA_DIR, "public.pem")
 if not (os.path.exists(priv_path) and os.path.exists(pub_path)):
-    print("No RSA keys found — generating new ones.")
+    log.info("No RSA keys found, generating new ones")
     generate_rsa_keys(priv_path=priv_path, pub_path=pub_path)
 
 private_key, public_key = load_rsa_keys(priv_path, pub_path)
 
 
-def save_face(username: str, enc_dict: dict, meta: dict = None):
-    if os.path.exists(DB_PATH):
-        with open(DB_PATH, "r") as f:
-            db = json.load(f)
-    else:
-        db = {"users": {}}
-    db["users"][username] = {"encoding": enc_dict, "meta": meta or {}}
-    with open(DB_PATH, "w") as f:
-        json.dump(db, f, indent=2)
-    print(f"[+] Saved {username} to {DB_PATH}")
+_store = None
+
+
+def open_store():
+    """The binary gallery, converted from faces.json on first use."""
+    global _store
+    if _store is None:
+        _store = open_gallery(private_key, public_key, path=DB_PATH)
+    return _store
+
 
+def save_face(username: str, encoding: np.ndarray, meta: dict = None):
+    store = open_store()
+    store.put(username, encoding, private_key, meta=meta)
+    # Keep the persisted search index in step with the gallery.
+    update_index_file(INDEX_PATH, store.unlock(private_key), added={username: encoding})
+    log.info("Saved", user=username, path=DB_PATH)
 
-def capture_face_and_register(username: str):
-    cap = cv2.VideoCapture(0)
+
+def capture_face_and_register(username: str, source=None, headless=None):
+    """Enrol `username` from the camera (or any frame source).
+
+    Interactively, SPACE captures and ESC cancels. Headless there is no
+    window: the first frame with a detectable face is used.
+    """
+    cfg = load_config()
+    source = cfg["source"]["uri"] if source is None else source
+    headless = cfg["display"]["headless"] if headless is None else headless
+    cap = open_source(source, realtime=not headless)
     if not cap.isOpened():
-        raise RuntimeError("Could not open camera.")
-    print("Position yourself. Press SPACE to capture, ESC to cancel.")
+        raise RuntimeError(f"Could not open frame source {source}.")
+    # same detection path as the monitor, so enrolment sees what it will see
+    detector = make_detector(cfg)
+    if not headless:
+        print("Position yourself. Press SPACE to capture, ESC to cancel.")  # instructions, not an event
 
     while True:
         ret, frame = cap.read()
         if not ret:
-            continue
-        cv2.imshow("Register", frame)
-        k = cv2.waitKey(1) & 0xFF
-        if k == 27:  # ESC
+            if isinstance(cap, CameraSource):
+                continue
+            log.warning("Frame source ended before a face was captured")
             break
-        if k == 32:  # SPACE
+        if headless:
+            capture = True
+        else:
+            cv2.imshow("Register", frame)
+            k = cv2.waitKey(1) & 0xFF
+            if k == 27:  # ESC
+                break
+            capture = k == 32  # SPACE
+        if capture:
             rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            boxes = face_recognition.face_locations(rgb)
+            boxes = detector.detect(rgb, full=True)
             if len(boxes) == 0:
-                print("No face detected. Try again.")
+                if not headless:
+                    log.warning("No face detected. Try again.")
                 continue
             encoding = face_recognition.face_encodings(rgb, [boxes[0]])[0]
-            enc_dict = encrypt_encoding(np.array(encoding), public_key)
-            save_face(username, enc_dict)
-            print("Registered:", username)
+            save_face(username, np.array(encoding))
+            log.info("Registered", user=username)
             break
     cap.release()
-    cv2.destroyAllWindows()
+    if not headless:
+        cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
-    uname = input("Enter username: ").strip()
+    import argparse
+    ap = argparse.ArgumentParser(description="Register a user's face")
+    ap.add_argument("username", nargs="?", help="prompted for when omitted")
+    ap.add_argument("--source", help="camera:N, video file, image directory or synthetic[:WxH]")
+    ap.add_argument("--headless", action="store_true", help="no preview; use the first frame with a face")
+    args = ap.parse_args()
+    uname = (args.username or input("Enter username: ")).strip()
     if uname:
-        capture_face_and_register(uname)
+        capture_face_and_register(uname, args.source, args.headless or None)
 
 
@@ -0,0 +1,147 @@
+# replay.py
+"""Push recorded footage through the full recognition pipeline and report throughput.
+
+    python replay.py footage.mp4                    # as fast as it can be recognised
+    python replay.py footage.mp4 --realtime         # at the file's own frame rate
+    python replay.py synthetic:1280x720 --frames 600 --json report.json
+    python replay.py frames/ --gallery data/faces.gal
+
+No camera or display is needed. Without --gallery the faces are matched
+against a synthetic gallery of --users entries, which exercises the same
+matcher code and cost without any enrolled users.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+from config import load_config
+from frame_sources import open_source
+from matcher import GalleryMatcher
+from metrics import Metrics
+from pipeline import FramePipeline
+from recognition import Recognizer
+from buffers import scratch
+
+DATA_DIR = "data"
+
+
+def synthetic_gallery(users, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(0.0, 0.09, size=(users, 128)).astype(np.float32)
+    return GalleryMatcher([f"user{i}" for i in range(users)], vecs)
+
+
+def stored_gallery(path):
+    from crypto_utils import load_rsa_keys
+    from gallery_store import GalleryStore
+    priv, _ = load_rsa_keys(os.path.join(DATA_DIR, "private.pem"), os.path.join(DATA_DIR, "public.pem"))
+    gallery = GalleryStore(path).load(priv)
+    return GalleryMatcher(list(gallery.keys()), list(gallery.values()))
+
+
+def replay(source, recognizer, pipeline_cfg, lossless=True):
+    """Run `source` to the end through a FramePipeline; returns a report dict.
+
+    `lossless` makes capture wait for the workers so every frame is
+    recognised; otherwise stale frames are dropped as in the live monitor.
+    """
+    stats = recognizer.stats
+    lock = threading.Lock()
+    latencies, matched = [], [0]
+
+    def process(frame):
+        result = recognizer.recognize(frame)
+        with lock:
+            latencies.append(result.latency)
+            matched[0] += bool(result.matched)
+        return result
+
+    pipeline = FramePipeline(source, process,
+                             workers=pipeline_cfg["recognition_workers"],
+                             frame_queue_size=pipeline_cfg["frame_queue_size"],
+                             result_queue_size=pipeline_cfg["result_queue_size"],
+                             metrics=stats, lossless=lossless)
+    start = time.perf_counter()
+    pipeline.start()
+    try:
+        while pipeline.running:
+            pipeline.next_result(timeout=0.1)
+    except KeyboardInterrupt:
+        pass  # report what was replayed so far
+    finally:
+        pipeline.stop()
+        source.release()
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "seconds": round(elapsed, 3),
+        "frames_read": pipeline.capture.seq,
+        "frames_recognised": len(latencies),
+        "frames_dropped": pipeline.frames.dropped,
+        "frames_matched": matched[0],
+        "fps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+    if latencies:
+        p50, p90, p99 = np.percentile(latencies, (50, 90, 99))
+        report["latency_ms"] = {"p50": round(p50 * 1000.0, 3), "p90": round(p90 * 1000.0, 3),
+                                "p99": round(p99 * 1000.0, 3)}
+    report["allocations"] = {"frame_buffers": pipeline.buffers.stats(), "scratch": scratch.stats()}
+    if recognizer.embedding_cache is not None:
+        report["embedding_cache"] = recognizer.embedding_cache.stats()
+    report["stages"] = stats.snapshot()["stages"]
+    return report
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("source", help="video file, image directory, camera:N or synthetic[:WxH]")
+    ap.add_argument("--realtime", action="store_true",
+                    help="deliver frames at the source's own rate and drop stale ones, like the monitor")
+    ap.add_argument("--loop", action="store_true", help="restart the footage at the end (stop with Ctrl+C)")
+    ap.add_argument("--frames", type=int, default=300, help="length of a synthetic source (unless --loop)")
+    ap.add_argument("--workers", type=int, help="recognition workers (default: from config)")
+    ap.add_argument("--users", type=int, default=100, help="size of the synthetic gallery")
+    ap.add_argument("--gallery", help="use this encrypted gallery (keys from data/) instead")
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args(argv)
+
+    cfg = load_config()
+    if args.workers:
+        cfg["pipeline"]["recognition_workers"] = args.workers
+    source = open_source(args.source, realtime=args.realtime, loop=args.loop,
+                         frames=None if args.loop else args.frames)
+    if not source.isOpened():
+        raise SystemExit(f"Cannot open {args.source}")
+
+    matcher = stored_gallery(args.gallery) if args.gallery else synthetic_gallery(args.users)
+    stats = Metrics()
+    recognizer = Recognizer(matcher, cfg, stats)
+    print(f"[*] Replaying {args.source} ({'real-time' if args.realtime else 'as fast as possible'}), "
+          f"{len(matcher)} users, {cfg['pipeline']['recognition_workers']} worker(s)")
+    report = replay(source, recognizer, cfg["pipeline"], lossless=not args.realtime)
+
+    print(f"[+] {report['frames_recognised']} frames in {report['seconds']}s: {report['fps']} fps, "
+          f"{report['frames_dropped']} dropped, {report['frames_matched']} matched")
+    if "latency_ms" in report:
+        lat = report["latency_ms"]
+        print(f"    latency p50 {lat['p50']} ms, p90 {lat['p90']} ms, p99 {lat['p99']} ms")
+    frames, work = report["allocations"]["frame_buffers"], report["allocations"]["scratch"]
+    print(f"    buffers: {frames['allocations']} frame allocations, {frames['reuses']} reuses; "
+          f"{work['allocations']} scratch allocations")
+    if "embedding_cache" in report:
+        cache = report["embedding_cache"]
+        print(f"    embedding cache: {cache['hits']} hits, {cache['misses']} misses, hit rate {cache['hit_rate']}")
+    for stage, summary in report["stages"].items():
+        if summary.get("count"):
+            print(f"    {stage:12} p50 {summary['p50_ms']:>8} ms  p99 {summary['p99_ms']:>8} ms  n={summary['count']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
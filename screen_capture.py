@@ -0,0 +1,105 @@
+# screen_capture.py
+"""Screen grabs and backdrop effects shared by LockOverlay and WelcomeOverlay.
+
+Grabs go through `mss` when it is installed (X11 shared memory on Linux,
+native APIs elsewhere) and fall back to PIL's ImageGrab. Blurring is done on a
+downscaled copy with OpenCV and then upscaled, which looks the same for large
+radii at a fraction of the cost of a full-resolution PIL GaussianBlur.
+"""
+import threading
+import time
+import cv2
+import numpy as np
+from PIL import Image, ImageGrab
+from config import load_config
+
+try:
+    import mss
+except ImportError:
+    mss = None
+
+_local = threading.local()
+
+
+def grab_screen():
+    """Current contents of the primary screen as an RGB uint8 array."""
+    if mss is not None:
+        try:
+            sct = getattr(_local, "sct", None)
+            if sct is None:
+                sct = _local.sct = mss.mss()  # mss handles are per-thread
+            shot = sct.grab(sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0])
+            return cv2.cvtColor(np.asarray(shot), cv2.COLOR_BGRA2RGB)
+        except Exception:
+            _local.sct = None
+    return np.asarray(ImageGrab.grab().convert("RGB"))
+
+
+def blur_darken(rgb, blur_radius=0, brightness=1.0, scale=0.25):
+    """Blur and darken `rgb` at reduced resolution, returning full-size RGB.
+
+    `scale` is the working resolution for the blur; the radius is scaled to
+    match so the result approximates a full-resolution blur of `blur_radius`.
+    """
+    h, w = rgb.shape[:2]
+    if blur_radius <= 0:
+        if brightness == 1.0:
+            return rgb
+        return cv2.convertScaleAbs(rgb, alpha=brightness)
+    small_w, small_h = max(1, int(w * scale)), max(1, int(h * scale))
+    small = cv2.resize(rgb, (small_w, small_h), interpolation=cv2.INTER_AREA)
+    # PIL's GaussianBlur radius is roughly the standard deviation
+    sigma = max(0.5, blur_radius * scale)
+    small = cv2.GaussianBlur(small, (0, 0), sigmaX=sigma)
+    if brightness != 1.0:
+        small = cv2.convertScaleAbs(small, alpha=brightness)
+    return cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+class ScreenBackdrop:
+    """Time-bounded cache of processed screen grabs.
+
+    `get()` returns a PIL image for the requested effect, re-grabbing the
+    screen only when the cached grab is older than `max_age` seconds.
+    """
+
+    def __init__(self, max_age=2.0, scale=0.25):
+        self.max_age = max_age
+        self.scale = scale
+        self._lock = threading.Lock()
+        self._grab = None
+        self._grab_time = 0.0
+        self._effects = {}
+
+    def refresh(self):
+        with self._lock:
+            self._grab = grab_screen()
+            self._grab_time = time.time()
+            self._effects = {}
+
+    def get(self, blur_radius=0, brightness=1.0, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        if self._grab is None or time.time() - self._grab_time > max_age:
+            self.refresh()
+        key = (blur_radius, brightness)
+        with self._lock:
+            img = self._effects.get(key)
+            if img is None:
+                img = Image.fromarray(blur_darken(self._grab, blur_radius, brightness, self.scale))
+                self._effects[key] = img
+            return img
+
+    @property
+    def age(self):
+        return time.time() - self._grab_time
+
+
+_shared = None
+
+
+def shared_backdrop():
+    """Process-wide ScreenBackdrop used by both overlays."""
+    global _shared
+    if _shared is None:
+        _shared = ScreenBackdrop(**load_config()["screen"])
+    return _shared
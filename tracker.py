@@ -0,0 +1,207 @@
+# tracker.py
+import itertools
+import threading
+import cv2
+import numpy as np
+
+SIGNATURE_SIZE = 24
+
+
+def iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+def _centre(box):
+    top, right, bottom, left = box
+    return (left + right) / 2.0, (top + bottom) / 2.0
+
+
+def _centroid_close(a, b):
+    """Centres within half a box diagonal of each other (for fast movers)."""
+    (ax, ay), (bx, by) = _centre(a), _centre(b)
+    diag = np.hypot(a[1] - a[3], a[2] - a[0])
+    return np.hypot(ax - bx, ay - by) < 0.5 * diag
+
+
+def signature(image, box):
+    """Zero-mean, unit-variance grey thumbnail of a face, used to spot drift."""
+    top, right, bottom, left = box
+    h, w = image.shape[:2]
+    crop = image[max(0, top):min(h, bottom), max(0, left):min(w, right)]
+    if crop.size == 0:
+        return None
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    thumb = cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA)
+    thumb = thumb.astype(np.float32)
+    thumb -= thumb.mean()
+    return thumb / (thumb.std() + 1e-6)
+
+
+def drift(a, b):
+    """1 - normalised correlation of two signatures (0 = identical)."""
+    if a is None or b is None:
+        return 1.0
+    return 1.0 - float(np.mean(a * b))
+
+
+def _make_cv_tracker():
+    # KCF/CSRT live in cv2 or cv2.legacy depending on the OpenCV build
+    for name in ("TrackerKCF_create", "TrackerCSRT_create", "TrackerMIL_create"):
+        for ns in (cv2, getattr(cv2, "legacy", None)):
+            factory = getattr(ns, name, None) if ns is not None else None
+            if factory is not None:
+                return factory()
+    return None
+
+
+class Track:
+    """One face followed across frames, with its cached identity."""
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.missed = 0          # consecutive frames without a detection
+        self.match = None        # FaceMatch from the last encoding, or None
+        self.verified_at = None  # timestamp of the last encoding
+        self.signature = None    # appearance now
+        self.reference = None    # appearance when last encoded
+        # (Frame, box) of the last detection, for cv trackers. The Frame, not
+        # its image: pooled buffers are recycled once their Frame is gone.
+        self.anchor = None
+        self.cv_tracker = None
+
+    @property
+    def visible(self):
+        """Detected this frame, or still being followed by a cv tracker."""
+        return self.missed == 0 or self.cv_tracker is not None
+
+    def __repr__(self):
+        name = self.match.name if self.match is not None else None
+        return f"Track({self.id}, {name!r}, missed={self.missed})"
+
+
+class FaceTracker:
+    """Associates detections with tracks so faces are encoded once, not per frame.
+
+    Detections are matched to existing tracks greedily by IoU, falling back to
+    centroid distance for faces that moved further than their box overlap
+    allows. A track is (re)encoded when it is new, when `reverify_seconds`
+    have passed since its last encoding, or when its appearance has drifted
+    by more than `drift_threshold` from what was encoded. A face the detector
+    misses is kept for `max_missed` frames, optionally followed by an OpenCV
+    correlation tracker in the meantime.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=5, reverify_seconds=1.0,
+                 drift_threshold=0.5, cv_tracker=False):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.reverify_seconds = reverify_seconds
+        self.drift_threshold = drift_threshold
+        self.use_cv_tracker = cv_tracker
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.tracks = []
+        self.encodings = 0
+
+    def _associate(self, boxes):
+        pairs = sorted(
+            ((iou(t.box, b), ti, bi) for ti, t in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+            reverse=True,
+        )
+        assigned, used_tracks, used_boxes = {}, set(), set()
+        for score, ti, bi in pairs:
+            if ti in used_tracks or bi in used_boxes:
+                continue
+            if score < self.iou_threshold and not _centroid_close(self.tracks[ti].box, boxes[bi]):
+                continue
+            assigned[bi] = self.tracks[ti]
+            used_tracks.add(ti)
+            used_boxes.add(bi)
+        return assigned
+
+    def _follow(self, track, image):
+        """Advance a track the detector lost this frame; False to drop it."""
+        if track.cv_tracker is None and track.anchor is not None:
+            anchor_frame, (top, right, bottom, left) = track.anchor
+            track.anchor = None
+            track.cv_tracker = _make_cv_tracker()
+            if track.cv_tracker is not None:
+                track.cv_tracker.init(anchor_frame.image, (left, top, right - left, bottom - top))
+        if track.cv_tracker is None:
+            return True
+        ok, (x, y, w, h) = track.cv_tracker.update(image)
+        if not ok:
+            return False
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        track.box = (y, x + w, y + h, x)
+        return True
+
+    def update(self, frame, boxes):
+        """Fold one frame's detections in; returns the live tracks.
+
+        Tracks the detector missed stay alive (so a one-frame detector dropout
+        does not cost a re-encode) but are only `visible` while a cv tracker
+        is following them.
+        """
+        image = frame.image
+        with self._lock:
+            assigned = self._associate(boxes)
+            seen = set()
+            for bi, box in enumerate(boxes):
+                track = assigned.get(bi)
+                if track is None:
+                    track = Track(next(self._ids), box)
+                    self.tracks.append(track)
+                seen.add(track.id)
+                track.box = box
+                track.missed = 0
+                track.cv_tracker = None
+                track.anchor = (frame, box) if self.use_cv_tracker else None
+                track.signature = signature(image, box)
+
+            live = []
+            for track in self.tracks:
+                if track.id in seen:
+                    live.append(track)
+                    continue
+                track.missed += 1
+                if track.missed <= self.max_missed and self._follow(track, image):
+                    if track.visible:
+                        track.signature = signature(image, track.box)
+                    live.append(track)
+            self.tracks = live
+            return list(live)
+
+    def needs_encoding(self, track, now):
+        if track.verified_at is None:
+            return True
+        if now - track.verified_at >= self.reverify_seconds:
+            return True
+        return drift(track.signature, track.reference) > self.drift_threshold
+
+    def verified(self, track, match, now):
+        """Store the identity found by encoding `track`'s current appearance."""
+        with self._lock:
+            track.match = match
+            track.verified_at = now
+            track.reference = track.signature
+            self.encodings += 1
+
+    def invalidate(self):
+        """Re-encode every track on its next frame (e.g. after a gallery change)."""
+        with self._lock:
+            for track in self.tracks:
+                track.verified_at = None
+
+    def reset(self):
+        with self._lock:
+            self.tracks = []
@@ -6,8 +6,12 @@ import os
 script_dir = os.path.abspath(os.path.dirname(__file__))
 os.chdir(script_dir)
 
-from animations import WelcomeOverlay
+from welcome_server import send_welcome
 
 if __name__ == "__main__":
     name = sys.argv[1] if len(sys.argv) > 1 else "User"
-    WelcomeOverlay(name).show()
+    # Thin client: hand off to the long-lived welcome server when it is up,
+    # otherwise play the animation in this process.
+    if not send_welcome(name):
+        from animations import WelcomeOverlay
+        WelcomeOverlay(name).show()
@@ -0,0 +1,106 @@
+# welcome_server.py
+"""Long-lived welcome animation service.
+
+Started once alongside the monitor. It keeps one hidden Tk root (and the
+shared screen backdrop cache) alive and plays a WelcomeOverlay whenever it
+receives {"cmd": "welcome", "name": ...} over the local socket, so unlocking no
+longer pays for a fresh interpreter, Tk init and PIL import each time.
+"""
+import os
+import sys
+import queue
+import subprocess
+import tkinter as tk
+from local_ipc import LineServer, request, ping
+from events import get_logger
+
+# resolve the socket next to this file so clients launched from anywhere agree
+script_dir = os.path.abspath(os.path.dirname(__file__))
+
+DATA_DIR = "data"
+SOCKET_PATH = os.path.join(DATA_DIR, "welcome.sock")
+TCP_PORT = 47811
+
+log = get_logger("welcome")
+
+
+def _address():
+    return os.path.join(script_dir, SOCKET_PATH), TCP_PORT
+
+
+def send_welcome(name, timeout=0.5):
+    """Ask a running server to show the welcome; False if none is reachable."""
+    try:
+        return request(*_address(), {"cmd": "welcome", "name": name}, timeout).get("ok", False)
+    except (OSError, ValueError):
+        return False
+
+
+def is_running():
+    return ping(*_address())
+
+
+def spawn():
+    """Start a server process in the background unless one is already up."""
+    if is_running():
+        return None
+    return subprocess.Popen([sys.executable, os.path.join(script_dir, "welcome_server.py")])
+
+
+class WelcomeServer:
+    POLL_MS = 50
+
+    def __init__(self):
+        # imported here so thin clients of this module stay light
+        from animations import WelcomeOverlay
+        self.overlay_cls = WelcomeOverlay
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.commands = queue.Queue()
+        self.current = None
+        self.server = LineServer(*_address(), self.handle, name="welcome")
+
+    def handle(self, msg):
+        # runs on a socket thread: only hand the command over to Tk
+        cmd = msg.get("cmd")
+        if cmd == "ping":
+            return {"ok": True}
+        if cmd in ("welcome", "quit"):
+            self.commands.put(msg)
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown command {cmd!r}"}
+
+    def _poll(self):
+        try:
+            while True:
+                msg = self.commands.get_nowait()
+                if msg["cmd"] == "quit":
+                    self.root.quit()
+                    return
+                self._welcome(msg.get("name") or "User")
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_MS, self._poll)
+
+    def _welcome(self, name):
+        if self.current is not None:
+            self.current.close()  # a newer unlock replaces the running welcome
+        self.current = self.overlay_cls(name, master=self.root)
+        self.current.play(on_done=self._finished)
+
+    def _finished(self):
+        self.current = None
+
+    def run(self):
+        self.server.start()
+        log.info("Welcome server listening", path=self.server.path)
+        self.root.after(self.POLL_MS, self._poll)
+        try:
+            self.root.mainloop()
+        finally:
+            self.server.close()
+
+
+if __name__ == "__main__":
+    os.chdir(script_dir)
+    WelcomeServer().run()